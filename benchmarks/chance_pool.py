@@ -0,0 +1,72 @@
+"""
+Benchmark for traversing the dealt children of chance nodes in the chance pool
+
+Runs on a fixed turn tree where betting continues after the river is dealt,
+and compares the serial traversal against the pool with 1 up to one worker
+per core. Run from the repository root with: python -m benchmarks.chance_pool
+"""
+import copy
+import os
+import time
+
+import numpy as np
+
+from benchmarks.states import turn_state
+from shallowstack.game.action import AGENT_ACTIONS
+from shallowstack.neural_net.neural_net_manager import NNManager
+from shallowstack.state_manager.state_manager import PokerGameStage
+from shallowstack.subtree.parallel import ResidentPool
+from shallowstack.subtree.subtree_manager import SubtreeManager, SubtreeNode
+
+
+def fixed_turn_tree(seed: int = 0) -> SubtreeManager:
+    strategy = np.ones((1326, len(AGENT_ACTIONS))) / len(AGENT_ACTIONS)
+    tree = SubtreeManager(
+        turn_state(seed),
+        PokerGameStage.RIVER,
+        1,
+        strategy,
+        action_limit=-1,
+        persistent=True,
+        rng=np.random.default_rng(seed),
+    )
+    tree.generate_full_tree(tree.root)
+    return tree
+
+
+def count_nodes(node: SubtreeNode) -> int:
+    return 1 + sum(count_nodes(child) for _, child in node.children)
+
+
+def time_per_iteration(tree: SubtreeManager, nbr_iterations: int) -> float:
+    r = np.ones(1326) / 1326
+    # The first iteration sends the subtrees to the workers
+    tree.run_iteration(r, r)
+    start = time.perf_counter()
+    for _ in range(nbr_iterations):
+        tree.run_iteration(r, r)
+    return (time.perf_counter() - start) / nbr_iterations
+
+
+def main(nbr_iterations: int = 10):
+    # Loaded before the workers are forked, so they share the networks
+    NNManager.instance().load_networks()
+    tree = fixed_turn_tree()
+    print(f"Nodes in tree: {count_nodes(tree.root)}, cores: {os.cpu_count()}")
+
+    serial_time = time_per_iteration(copy.deepcopy(tree), nbr_iterations)
+    print(f"Serial:    {serial_time * 1000:8.2f} ms / iteration")
+
+    for workers in range(1, os.cpu_count() + 1):
+        pooled = copy.deepcopy(tree)
+        pooled.chance_pool = ResidentPool.instance("chance", workers)
+        pooled_time = time_per_iteration(pooled, nbr_iterations)
+        pooled.release_workers()
+        print(
+            f"{workers:2d} workers: {pooled_time * 1000:8.2f} ms / iteration, "
+            f"{serial_time / pooled_time:5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
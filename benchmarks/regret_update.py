@@ -0,0 +1,82 @@
+"""
+Benchmark for the regret update in SubtreeManager.update_strategy_at_node
+
+Runs on a fixed river tree and compares against the original per-hand loop.
+Run from the repository root with: python -m benchmarks.regret_update
+"""
+import time
+
+import numpy as np
+
+from shallowstack.game.action import AGENT_ACTIONS, agent_action_index
+from benchmarks.states import river_state
+from shallowstack.poker.card import HOLE_PAIR_INDICES
+from shallowstack.state_manager.state_manager import PokerGameStage
+from shallowstack.subtree.subtree_manager import (
+    NodeType,
+    NodeVisitStatus,
+    SubtreeManager,
+    SubtreeNode,
+)
+
+
+def fixed_river_tree(seed: int = 0) -> SubtreeManager:
+    state = river_state(seed)
+    strategy = np.ones((1326, len(AGENT_ACTIONS))) / len(AGENT_ACTIONS)
+    tree = SubtreeManager(state, PokerGameStage.RIVER, 3, strategy)
+
+    r = np.ones(1326) / 1326
+    tree.subtree_traversal_rollout(tree.root, r, r)
+    return tree
+
+
+def loop_regret_update(tree: SubtreeManager, node: SubtreeNode):
+    """The original scalar update, kept as the reference"""
+    R_t = node.regrets
+    player_index = (node.state.current_player_index + tree.root_player_index) % 2
+    for h in HOLE_PAIR_INDICES:
+        node_value = node.values[player_index][h]
+        for action, child in node.children:
+            if child.visited != NodeVisitStatus.VISITED_THIS_ITERATION:
+                continue
+            a = agent_action_index(action)
+            child_value = child.values[player_index][h]
+            R_t[h, a] += child_value - node_value
+
+
+def player_nodes(node: SubtreeNode):
+    if node.node_type == NodeType.PLAYER:
+        yield node
+    for _, child in node.children:
+        yield from player_nodes(child)
+
+
+def time_per_iteration(fn, nbr_iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(nbr_iterations):
+        fn()
+    return (time.perf_counter() - start) / nbr_iterations
+
+
+def main(nbr_iterations: int = 20):
+    tree = fixed_river_tree()
+    nodes = list(player_nodes(tree.root))
+
+    def loop_update():
+        for node in nodes:
+            loop_regret_update(tree, node)
+
+    def vectorized_update():
+        tree.update_strategy_at_node(tree.root)
+
+    loop_time = time_per_iteration(loop_update, nbr_iterations)
+    vectorized_time = time_per_iteration(vectorized_update, nbr_iterations)
+
+    print(f"Player nodes in tree: {len(nodes)}")
+    print(f"Loop update:       {loop_time * 1000:8.2f} ms / iteration")
+    print(f"Vectorized update: {vectorized_time * 1000:8.2f} ms / iteration")
+    print(f"Speedup:           {loop_time / vectorized_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
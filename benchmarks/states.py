@@ -0,0 +1,49 @@
+"""
+Fixed game states shared by the benchmarks and the tests
+"""
+import random
+from typing import Optional
+
+import numpy as np
+
+from shallowstack.poker.card import Deck
+from shallowstack.state_manager.state_manager import GameState, PokerGameStage
+
+
+def river_state(seed: Optional[int] = None) -> GameState:
+    """
+    A river state with 50 chips from each player in the pot,
+    where the first player is to act. Seeding fixes the public cards
+    """
+    return stage_state(PokerGameStage.RIVER, 5, seed)
+
+
+def turn_state(seed: Optional[int] = None) -> GameState:
+    """
+    Like river_state, but on the turn
+    """
+    return stage_state(PokerGameStage.TURN, 4, seed)
+
+
+def stage_state(
+    stage: PokerGameStage, nbr_public_cards: int, seed: Optional[int] = None
+) -> GameState:
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+
+    deck = Deck()
+    public_cards = deck.draw(nbr_public_cards)
+    return GameState(
+        stage,
+        0,
+        np.array([50.0, 50.0]),
+        np.ones(2) * 1000,
+        np.zeros(2),
+        np.ones(2),
+        np.zeros(2, dtype=bool),
+        100,
+        50,
+        public_cards,
+        deck,
+    )
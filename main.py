@@ -1,15 +1,22 @@
+import os
+
+from shallowstack.config.config import SERVICE_CONFIG
 from shallowstack.game.poker_game import (
     PLAYER_CONFIGS,
     GameManager,
     custom_player_setup,
 )
-from shallowstack.neural_net.datamodule import PokerDataModule
-from shallowstack.neural_net.neural_net_trainer import NNTrainer
+from shallowstack.neural_net.neural_net_manager import EXPORT_DIR, NNManager
 from shallowstack.player.human import Human
 from shallowstack.player.hybrid_player import HybridPlayer
 from shallowstack.player.resolve_player import ResolvePlayer
 from shallowstack.player.rollout_player import RolloutPlayer
 from shallowstack.poker.card import Card
+from shallowstack.poker.card_abstraction import (
+    ABSTRACTION_DIR,
+    NBR_BUCKETS,
+    CardAbstraction,
+)
 from shallowstack.poker.poker_oracle import PokerOracle
 
 import debugpy
@@ -54,6 +61,9 @@ def generate_training_data_single_stage(stage: str, size: int, override: bool):
         print("Invalid stage")
         return
 
+    # Imported here so playing does not have to import torch and lightning
+    from shallowstack.neural_net.datamodule import PokerDataModule
+
     d = PokerDataModule(s, 1, size, force_override=override)
     d.setup("")
 
@@ -77,6 +87,8 @@ def train_single_network(stage: str):
         print("Invalid stage")
         return
 
+    from shallowstack.neural_net.neural_net_trainer import NNTrainer
+
     nn_trainer = NNTrainer()
 
     nn_trainer.train_network(s, 100)
@@ -99,10 +111,46 @@ def train_single_network(stage: str):
     type=click.BOOL,
 )
 def train_all(epochs: int, data_size: int, override_river: bool):
+    from shallowstack.neural_net.neural_net_trainer import NNTrainer
+
     nn_trainer = NNTrainer()
     nn_trainer.train_all_networks(epochs, data_size, override_river)
 
 
+@cli.command()
+@click.option("--dest", default=EXPORT_DIR, type=click.Path(file_okay=False))
+def export_networks(dest: str):
+    """
+    Exports the trained networks for the torch-free NumPy runtime
+    """
+    NNManager(quantize=False, backend="torch").export_networks(dest)
+    print(f"Exported networks to {dest}")
+
+
+@cli.command()
+@click.option(
+    "--stage",
+    default="RIVER",
+    type=click.Choice([el for el in PokerGameStage.__members__]),
+)
+@click.option(
+    "--buckets",
+    default=NBR_BUCKETS if NBR_BUCKETS > 0 else 100,
+    type=click.IntRange(min=1),
+)
+@click.option("--boards", default=50, type=click.IntRange(min=1))
+def fit_abstraction(stage: str, buckets: int, boards: int):
+    """
+    Clusters the hands of a stage into buckets for the card abstraction
+    """
+    s = PokerGameStage[stage]
+    abstraction = CardAbstraction.fit(s, buckets, boards)
+
+    os.makedirs(ABSTRACTION_DIR, exist_ok=True)
+    abstraction.save(f"{ABSTRACTION_DIR}/{s.name}.npz")
+    print(f"Saved {buckets} buckets for {s.name} to {ABSTRACTION_DIR}")
+
+
 @cli.command()
 def generate_cheat_sheet():
     PokerOracle.generate_hand_win_probabilities(nbr_iterations=1000)
@@ -144,5 +192,19 @@ def game(player_setup: str, nbr_rounds: int):
     game.start_game(nbr_rounds)
 
 
+@cli.command()
+@click.option("--port", default=SERVICE_CONFIG.getint("PORT", 8000), type=int)
+def serve(port: int):
+    """
+    Runs the resolve service on localhost
+    """
+    # Imported here so playing does not need the service dependencies
+    import uvicorn
+
+    from shallowstack.service.app import create_app
+
+    uvicorn.run(create_app(), host=SERVICE_CONFIG.get("HOST", "127.0.0.1"), port=port)
+
+
 if __name__ == "__main__":
     cli()
@@ -5,3 +5,7 @@ config.read("config.ini")
 
 POKER_CONFIG: configparser.SectionProxy = config["POKER"]
 RESOLVER_CONFIG: configparser.SectionProxy = config["RESOLVER"]
+NEURAL_NET_CONFIG: configparser.SectionProxy = config["NEURAL_NET"]
+ABSTRACTION_CONFIG: configparser.SectionProxy = config["ABSTRACTION"]
+DATA_CONFIG: configparser.SectionProxy = config["DATA"]
+SERVICE_CONFIG: configparser.SectionProxy = config["SERVICE"]
@@ -0,0 +1,65 @@
+from itertools import permutations
+
+import numpy as np
+
+from shallowstack.poker.card import hole_card_ids_from_pair_idx, hole_pair_idx_from_ids
+
+# All 24 permutations of the suits, and what they do to every card and hole pair.
+# Card ids are rank * 4 + suit
+SUIT_PERMUTATIONS = np.array(list(permutations(range(4))))
+CARD_PERMUTATIONS = (np.arange(52) // 4 * 4)[None, :] + SUIT_PERMUTATIONS[
+    :, np.arange(52) % 4
+]
+
+
+def _hand_permutations() -> np.ndarray:
+    hands = np.array([hole_card_ids_from_pair_idx(i) for i in range(1326)])
+    result = np.zeros((len(SUIT_PERMUTATIONS), 1326), dtype=int)
+    for p, cards in enumerate(CARD_PERMUTATIONS):
+        for i, (c1, c2) in enumerate(hands):
+            result[p, i] = hole_pair_idx_from_ids(cards[c1], cards[c2])
+    return result
+
+
+# HAND_PERMUTATIONS[p, i] is where hole pair i ends up under permutation p
+HAND_PERMUTATIONS = _hand_permutations()
+# Gathering with the inverse permutes a range: permuted = r[HAND_SOURCES[p]]
+HAND_SOURCES = np.argsort(HAND_PERMUTATIONS, axis=1)
+
+
+class SuitAugmentation:
+    """
+    Applies a random suit permutation to every example in a batch
+
+    Values do not change when suits are renamed, so permuting the board,
+    the ranges and the target values gives a new valid example.
+    With bucketed ranges only the board is permuted,
+    as the buckets do not depend on suits
+    """
+
+    def __init__(self, range_size: int, public_info_size: int):
+        self.range_size = range_size
+        self.public_info_size = public_info_size
+
+    def __call__(self, batch: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """
+        Permutes the examples of a (batch, input_size + output_size) array in place
+        """
+        R = self.range_size
+        P = self.public_info_size
+        perms = rng.integers(len(SUIT_PERMUTATIONS), size=len(batch))
+
+        board = batch[:, 2 * R : 2 * R + P].astype(int)
+        batch[:, 2 * R : 2 * R + P] = np.take_along_axis(
+            CARD_PERMUTATIONS[perms], board, axis=1
+        )
+
+        if R == 1326:
+            sources = HAND_SOURCES[perms]
+            # Ranges, then the target values after the board and the pot
+            for start in [0, R, 2 * R + P + 1, 3 * R + P + 1]:
+                batch[:, start : start + R] = np.take_along_axis(
+                    batch[:, start : start + R], sources, axis=1
+                )
+
+        return batch
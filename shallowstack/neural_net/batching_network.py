@@ -0,0 +1,91 @@
+from queue import Empty, Queue
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+class BatchRequest:
+    """
+    Input vectors waiting to be evaluated, and their values once they are
+    """
+
+    def __init__(self, x: np.ndarray):
+        # The input may be a view of an encoder buffer the caller reuses
+        self.x = np.array(x, dtype=np.float32, copy=True)
+        self.done = threading.Event()
+        self.values: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self.error: Optional[BaseException] = None
+
+
+class BatchingNetwork:
+    """
+    Shares a network between resolves running in several threads,
+    running their evaluations together in shared batches
+
+    Every call waits up to window seconds for calls from other threads,
+    or until max_batch_size input vectors are waiting, and the vectors of
+    all of them are evaluated in one forward pass of the network
+    """
+
+    def __init__(self, network, window: float, max_batch_size: int):
+        self.network = network
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.range_size = network.range_size
+        self.public_info_size = network.public_info_size
+        self.input_size = network.input_size
+
+        self.requests: "Queue[BatchRequest]" = Queue()
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def predict_values(self, x) -> Tuple[np.ndarray, np.ndarray]:
+        v1, v2 = self.predict_values_batch(np.asarray(x).reshape(1, -1))
+        return v1[0], v2[0]
+
+    def predict_values_batch(self, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        request = BatchRequest(x)
+        self.requests.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.values
+
+    def serve(self):
+        """
+        Collects requests into batches and evaluates them, for the life of the process
+        """
+        while True:
+            batch = [self.requests.get()]
+            size = len(batch[0].x)
+            deadline = time.perf_counter() + self.window
+            while size < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self.requests.get(timeout=timeout)
+                except Empty:
+                    break
+                batch.append(request)
+                size += len(request.x)
+
+            self.evaluate(batch)
+
+    def evaluate(self, batch: List[BatchRequest]):
+        try:
+            v1, v2 = self.network.predict_values_batch(
+                np.concatenate([request.x for request in batch])
+            )
+        except BaseException as error:
+            for request in batch:
+                request.error = error
+                request.done.set()
+            return
+
+        offsets = np.cumsum([0] + [len(request.x) for request in batch])
+        for request, start, stop in zip(batch, offsets[:-1], offsets[1:]):
+            request.values = (v1[start:stop], v2[start:stop])
+            request.done.set()
@@ -0,0 +1,46 @@
+from typing import Tuple
+
+import numpy as np
+
+from shallowstack.neural_net.util import InputEncoder
+from shallowstack.poker.card_abstraction import RANGE_SIZE, CardAbstraction
+
+
+class BucketedNetwork:
+    """
+    Runs a network trained on bucketed ranges behind the regular inference API
+
+    Takes the usual 1326 hand input vectors, sums the ranges into the buckets
+    of each board, and gives every hand the value predicted for its bucket
+    """
+
+    def __init__(self, network, abstraction: CardAbstraction):
+        self.network = network
+        self.abstraction = abstraction
+        self.range_size = RANGE_SIZE
+        self.public_info_size = network.public_info_size
+        self.input_size = RANGE_SIZE * 2 + self.public_info_size + 1
+
+    def predict_values(self, x) -> Tuple[np.ndarray, np.ndarray]:
+        v1, v2 = self.predict_values_batch(np.asarray(x).reshape(1, -1))
+        return v1[0], v2[0]
+
+    def predict_values_batch(self, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        public_input = x[:, 2 * RANGE_SIZE :]
+        card_ids = public_input[:, : self.public_info_size].astype(int)
+        tables = np.stack([self.abstraction.bucket_table(ids) for ids in card_ids])
+
+        encoder = InputEncoder.for_size(
+            self.public_info_size, self.abstraction.nbr_buckets
+        )
+        x_b = encoder.encode_public(
+            self.abstraction.bucket_ranges(x[:, :RANGE_SIZE], tables),
+            self.abstraction.bucket_ranges(x[:, RANGE_SIZE : 2 * RANGE_SIZE], tables),
+            public_input,
+        )
+        v1, v2 = self.network.predict_values_batch(x_b)
+
+        return (
+            self.abstraction.expand_values(v1, tables),
+            self.abstraction.expand_values(v2, tables),
+        )
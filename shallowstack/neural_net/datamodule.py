@@ -7,29 +7,52 @@ from typing import Tuple
 
 import lightning as pl
 import numpy as np
-import torch
 from torch.utils.data import DataLoader
-from torch.utils.data import random_split
 from tqdm import tqdm
+from shallowstack.config.config import DATA_CONFIG
 from shallowstack.game.action import AGENT_ACTIONS
 
-from shallowstack.neural_net.util import create_input_vector, create_output_vector
+from shallowstack.neural_net.augmentation import SuitAugmentation
+from shallowstack.neural_net.sharded_dataset import ShardedDataset
+from shallowstack.neural_net.shards import (
+    ShardWriter,
+    count_duplicate_rows,
+    load_manifest,
+)
+from shallowstack.neural_net.util import InputEncoder
 from shallowstack.poker.card import Card
 from shallowstack.poker.card import Deck
+from shallowstack.poker.card_abstraction import (
+    NBR_BUCKETS,
+    CardAbstraction,
+    network_range_size,
+    public_card_count,
+)
 from shallowstack.state_manager.state_manager import GameState, PokerGameStage
 from shallowstack.subtree.subtree_manager import AVG_POT_SIZE
 from shallowstack.subtree.subtree_manager import SubtreeManager
 
+WORKERS = DATA_CONFIG.getint("WORKERS", 3)
+CHUNK_SIZE = DATA_CONFIG.getint("CHUNK_SIZE", 4)
+SHARD_SIZE = DATA_CONFIG.getint("SHARD_SIZE", 1000)
+# Entropy for the random streams of the examples, a fresh one is drawn if not set
+SEED = DATA_CONFIG.getint("SEED", None)
+SUIT_AUGMENTATION = DATA_CONFIG.getboolean("SUIT_AUGMENTATION", True)
+
 
 def generate_random_ranges(
-    public_cards: List[Card], range_size: int = 1326
+    public_cards: List[Card],
+    range_size: int = 1326,
+    rng: Optional[np.random.Generator] = None,
 ) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Generates two player ranges filtered by the provdied public cards
+    Generates two player ranges filtered by the provdied public cards,
+    drawn with the given generator or the global one
     """
-    r1 = np.random.random(range_size)
+    random = rng if rng is not None else np.random
+    r1 = random.random(range_size)
     r1 = r1 / np.sum(r1)
-    r2 = np.random.random(range_size)
+    r2 = random.random(range_size)
     r2 = r2 / np.sum(r2)
 
     r1 = SubtreeManager.update_range_from_public_cards(r1, public_cards)
@@ -40,13 +63,17 @@ def generate_random_ranges(
 
 def generate_initial_situation_from_public_cards(
     public_cards: List[Card],
+    rng: Optional[np.random.Generator] = None,
 ) -> Tuple[np.ndarray, np.ndarray, int]:
     """
     Generates one random startin_value for neural net training
 
     """
-    r1, r2 = generate_random_ranges(public_cards)
-    pot = np.random.randint(0, AVG_POT_SIZE * 2)
+    r1, r2 = generate_random_ranges(public_cards, rng=rng)
+    if rng is not None:
+        pot = int(rng.integers(0, AVG_POT_SIZE * 2))
+    else:
+        pot = np.random.randint(0, AVG_POT_SIZE * 2)
 
     return (r1, r2, pot)
 
@@ -57,9 +84,10 @@ def get_calculated_values_for_situation(
     r2: np.ndarray,
     pot: int,
     public_cards: List[Card],
+    rng: Optional[np.random.Generator] = None,
 ) -> Tuple[np.ndarray, np.ndarray]:
     """Returns the calculated values for the given situation"""
-    deck = Deck()
+    deck = Deck(rng=rng)
     deck.remove_cards(public_cards)
 
     game_state = GameState(
@@ -90,32 +118,44 @@ def get_calculated_values_for_situation(
 
     strategy = np.ones((r1.size, len(AGENT_ACTIONS))) / r1.size
 
-    tree = SubtreeManager(game_state, end_stage, end_depth, strategy)
+    tree = SubtreeManager(game_state, end_stage, end_depth, strategy, rng=rng)
 
     v1, v2 = tree.subtree_traversal_rollout(tree.root, r1, r2)
 
     return (v1, v2)
 
 
-def get_random_example(arg: Tuple[PokerGameStage, int]) -> torch.Tensor:
-    stage, nbr_public_cards = arg
+def get_random_example(
+    arg: Tuple[PokerGameStage, int, np.random.SeedSequence]
+) -> np.ndarray:
+    """
+    Generates one training example, encoded as a float32 row of
+    the input vector followed by the target values
 
-    d = Deck()
-    public_cards = d.draw(nbr_public_cards)
+    Every example is drawn from its own random stream, seeded by the given
+    seed sequence, so examples never depend on which worker generates them
+    """
+    stage, nbr_public_cards, seed_sequence = arg
+    rng = np.random.default_rng(seed_sequence)
 
-    r1, r2, pot = generate_initial_situation_from_public_cards(public_cards)
+    d = Deck(rng=rng)
+    public_cards = d.draw(nbr_public_cards)
 
-    v1, v2 = get_calculated_values_for_situation(stage, r1, r2, pot, public_cards)
+    r1, r2, pot = generate_initial_situation_from_public_cards(public_cards, rng)
 
-    output = create_output_vector(
-        torch.tensor(v1).reshape(1, -1),
-        torch.tensor(v2).reshape(1, -1),
-        torch.zeros(1).reshape(1, -1),
-    )
+    v1, v2 = get_calculated_values_for_situation(stage, r1, r2, pot, public_cards, rng)
 
-    example = torch.cat((create_input_vector(r1, r2, public_cards, pot), output), dim=1)
+    if NBR_BUCKETS > 0:
+        # The networks are trained on bucketed ranges and values
+        abstraction = CardAbstraction.for_stage(stage)
+        tables = abstraction.bucket_table([card.id for card in public_cards])[None]
+        v1 = abstraction.bucket_values(v1[None], r1[None], tables)[0]
+        v2 = abstraction.bucket_values(v2[None], r2[None], tables)[0]
+        r1 = abstraction.bucket_ranges(r1[None], tables)[0]
+        r2 = abstraction.bucket_ranges(r2[None], tables)[0]
 
-    return example
+    encoder = InputEncoder.for_size(nbr_public_cards, r1.size)
+    return encoder.encode_examples(r1, r2, [public_cards], [pot], v1, v2)[0]
 
 
 class PokerDataModule(pl.LightningDataModule):
@@ -139,37 +179,47 @@ class PokerDataModule(pl.LightningDataModule):
             shutil.rmtree(self.data_dir, ignore_errors=True)
 
     def setup(self, stage: str):
-        if not os.path.exists(self.data_dir):
-            self.generate_dataset(self.stage, self.data_size, show_progress=True)
+        # Only generates the examples missing from the dataset
+        self.generate_dataset(self.stage, self.data_size, show_progress=True)
 
-        self.test_data = torch.load(f"{self.data_dir}/test.pt")
-        all = torch.load(f"{self.data_dir}/train.pt")
-        all = all.type(torch.float32)
+        size = load_manifest(self.data_dir)["size"]
 
+        # The splits are index ranges over the same shards
+        test_fraction = 0.2
         val_fraction = 0.1
+        test_start = size - int(test_fraction * size)
+        val_start = test_start - int(val_fraction * test_start)
 
-        val_size = int(val_fraction * len(all))
-        train_size = len(all) - val_size
-
-        self.train_data, self.val_data = random_split(all, [train_size, val_size])
+        augmentation = None
+        if SUIT_AUGMENTATION:
+            augmentation = SuitAugmentation(
+                network_range_size(), public_card_count(self.stage)
+            )
 
-    def train_dataloader(self):
-        return DataLoader(
-            self.train_data,
-            batch_size=self.batch_size,
+        self.train_data = ShardedDataset(
+            self.data_dir,
+            0,
+            val_start,
+            self.batch_size,
             shuffle=True,
-            num_workers=self.workers,
+            augmentation=augmentation,
+        )
+        self.val_data = ShardedDataset(
+            self.data_dir, val_start, test_start, self.batch_size
+        )
+        self.test_data = ShardedDataset(
+            self.data_dir, test_start, size, self.batch_size
         )
 
+    def train_dataloader(self):
+        # The datasets serve whole batches
+        return DataLoader(self.train_data, batch_size=None, num_workers=self.workers)
+
     def val_dataloader(self):
-        return DataLoader(
-            self.val_data, batch_size=self.batch_size, num_workers=self.workers
-        )
+        return DataLoader(self.val_data, batch_size=None, num_workers=self.workers)
 
     def test_dataloader(self):
-        return DataLoader(
-            self.test_data, batch_size=self.batch_size, num_workers=self.workers
-        )
+        return DataLoader(self.test_data, batch_size=None, num_workers=self.workers)
 
     # INternal stuff
 
@@ -181,12 +231,15 @@ class PokerDataModule(pl.LightningDataModule):
         show_progress: bool = False,
     ):
         """
-        Generates a dataset saved to the data folder for the given stage and size
+        Generates a dataset of the given size for the stage, saved as shards
+        in the data folder
+
+        Completed shards of an earlier, interrupted generation are kept,
+        and only the missing examples are generated.
 
         if name is given this will be used to override the dataset name, if not the name
-        is based on the stage and nbr examples
+        is based on the stage
         """
-        print(f"generating data for {stage.name}")
         if name is None:
             name = f"{stage.name}"
 
@@ -201,25 +254,35 @@ class PokerDataModule(pl.LightningDataModule):
         elif stage == PokerGameStage.RIVER:
             nbr_public = 5
 
-        test_fraction = 0.2
-        nbr_test = int(test_fraction * size)
-
-        with Pool(3) as p:
-            dataset = torch.cat(
-                list(
-                    tqdm(
-                        p.imap(get_random_example, [(stage, nbr_public)] * size),
-                        total=size,
-                        disable=not show_progress,
-                    )
-                )
+        encoder = InputEncoder.for_size(nbr_public, network_range_size())
+        writer = ShardWriter(
+            f"data/{name}", encoder.input_size + encoder.output_size, SHARD_SIZE
+        )
+        remaining = size - writer.size
+        if remaining <= 0:
+            return
+
+        # The seed is kept in the manifest, so a resumed generation continues
+        # the same streams instead of repeating the first examples
+        if "seed" not in writer.manifest:
+            writer.manifest["seed"] = (
+                SEED if SEED is not None else np.random.SeedSequence().entropy
             )
-
-        print("Finished with dataset generation")
-
-        train_dataset, test_dataset = dataset.split([size - nbr_test, nbr_test])
-
-        if not os.path.exists(f"data/{name}"):
-            os.makedirs(f"data/{name}")
-        torch.save(train_dataset, f"data/{name}/train.pt")
-        torch.save(test_dataset, f"data/{name}/test.pt")
+        seed_sequences = np.random.SeedSequence(writer.manifest["seed"]).spawn(size)
+
+        print(f"generating {remaining} examples for {stage.name}")
+        with Pool(WORKERS) as p:
+            examples = p.imap(
+                get_random_example,
+                [(stage, nbr_public, s) for s in seed_sequences[writer.size :]],
+                chunksize=CHUNK_SIZE,
+            )
+            for example in tqdm(examples, total=remaining, disable=not show_progress):
+                writer.add(example)
+        writer.flush()
+
+        duplicates = count_duplicate_rows(f"data/{name}")
+        print(
+            f"Finished with dataset generation: {writer.size} examples, "
+            f"{duplicates} duplicates"
+        )
@@ -9,10 +9,12 @@ import numpy as np
 class ValueNetwork(pl.LightningModule):
     def __init__(self, range_size: int, public_info_size: int):
         super().__init__()
+        self.save_hyperparameters()
         self.range_size = range_size
         self.public_info_size = public_info_size
+        self.input_size = range_size * 2 + public_info_size + 1
 
-        self.fc1 = nn.Linear(range_size * 2 + public_info_size + 1, 256)
+        self.fc1 = nn.Linear(self.input_size, 256)
         self.fc2 = nn.Linear(256, 128)
         self.fc3 = nn.Linear(128, 64)
         self.fc4 = nn.Linear(64, 32)
@@ -24,12 +26,35 @@ class ValueNetwork(pl.LightningModule):
         Wrapper function that returns the interesting values
         for other parts of the application
         """
-        out = self(x).squeeze(0)
-        v1, v2, _ = out.split([self.range_size, self.range_size, 1])
-        return v1.detach().numpy(), v2.detach().numpy()
+        v1, v2 = self.predict_values_batch(x.numpy())
+        return v1[0], v2[0]
+
+    def predict_values_batch(self, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Inference fast path for a batch of input vectors
+
+        Takes a (batch, input_size) array, and returns the values
+        as two (batch, range_size) arrays. Only the value head is computed,
+        without tracking gradients
+        """
+        x_t = torch.from_numpy(np.ascontiguousarray(x, dtype=np.float32))
+        with torch.inference_mode():
+            values = self.values(x_t).numpy()
+        return values[:, : self.range_size], values[:, self.range_size :]
+
+    def values(self, x: torch.Tensor) -> torch.Tensor:
+        """
+        Computes the value vectors of both players, concatenated
+        """
+        x = torch.relu(self.fc1(x))
+        x = torch.relu(self.fc2(x))
+        x = torch.relu(self.fc3(x))
+        x = torch.relu(self.fc4(x))
+
+        return self.value_output(x)
 
     def forward(self, x: torch.Tensor) -> torch.Tensor:
-        r1, r2, _ = x.clone().split(
+        r1, r2, _ = x.split(
             [
                 self.range_size,
                 self.range_size,
@@ -38,12 +63,7 @@ class ValueNetwork(pl.LightningModule):
             dim=1,
         )
 
-        x = torch.relu(self.fc1(x))
-        x = torch.relu(self.fc2(x))
-        x = torch.relu(self.fc3(x))
-        x = torch.relu(self.fc4(x))
-
-        values = self.value_output(x)
+        values = self.values(x)
         v1, v2 = values.split([self.range_size, self.range_size], dim=1)
 
         dot_sum = (
@@ -53,6 +73,15 @@ class ValueNetwork(pl.LightningModule):
 
         return create_output_vector(v1, v2, dot_sum)
 
+    def quantized(self) -> "ValueNetwork":
+        """
+        Returns a copy for CPU inference with the linear layers
+        dynamically quantized to int8
+        """
+        return torch.ao.quantization.quantize_dynamic(
+            self, {nn.Linear}, dtype=torch.qint8
+        )
+
     def training_step(self, batch: torch.Tensor, batch_idx):
         """
         Implements one interation in the training loop
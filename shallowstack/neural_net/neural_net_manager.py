@@ -1,57 +1,234 @@
+from __future__ import annotations
+
 import os
 from glob import glob
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Union
+
+import numpy as np
 
-from shallowstack.neural_net.model import ValueNetwork
+from shallowstack.config.config import NEURAL_NET_CONFIG
+from shallowstack.neural_net.bucketed_network import BucketedNetwork
+from shallowstack.neural_net.numpy_network import NumpyValueNetwork
+from shallowstack.poker.card_abstraction import (
+    NBR_BUCKETS,
+    CardAbstraction,
+    network_range_size,
+)
 from shallowstack.state_manager.state_manager import PokerGameStage
 
+if TYPE_CHECKING:
+    from shallowstack.neural_net.model import ValueNetwork
+
+QUANTIZE = NEURAL_NET_CONFIG.getboolean("QUANTIZE", False)
+TORCH_THREADS = NEURAL_NET_CONFIG.getint("TORCH_THREADS", 0)
+BACKEND = NEURAL_NET_CONFIG.get("BACKEND", "torch")
+EXPORT_DIR = NEURAL_NET_CONFIG.get("EXPORT_DIR", "models")
+
+Network = Union["ValueNetwork", NumpyValueNetwork, BucketedNetwork]
+
 
 class NNManager:
-    def __init__(self):
-        # Load the networks
-        self.river_network = self.load_network(PokerGameStage.RIVER)
-        self.turn_network = self.load_network(PokerGameStage.TURN)
-        self.flop_network = self.load_network(PokerGameStage.FLOP)
-        self.pre_flop_network = self.load_network(PokerGameStage.PRE_FLOP)
+    """
+    Registry of the value networks
+
+    Use NNManager.instance() to get the registry shared by the whole process,
+    so every network is only loaded once no matter how many resolvers
+    or data generation tasks need it.
+
+    With NBR_BUCKETS set, the networks work on bucketed ranges,
+    and are wrapped so they still take and return 1326 hand vectors
+    """
+
+    _instance: Optional["NNManager"] = None
+
+    def __init__(
+        self,
+        quantize: bool = QUANTIZE,
+        torch_threads: int = TORCH_THREADS,
+        backend: str = BACKEND,
+    ):
+        """
+        quantize: Dynamically quantize the linear layers of the networks to int8
+        torch_threads: Pins the number of threads torch uses, 0 keeps the default
+        backend: "torch" to run the checkpoints, or "numpy" to run the exported
+            networks. NumPy is always used if torch is not installed
+        """
+        # The networks are loaded the first time they are needed
+        self.networks: Dict[PokerGameStage, Network] = {}
+        self.quantize = quantize
+        self.use_torch = False
 
-    def get_network(self, stage: PokerGameStage) -> ValueNetwork:
+        if backend == "torch":
+            # torch is only imported when it is used, as it is slow to import
+            try:
+                import torch
+
+                self.use_torch = True
+                if torch_threads > 0:
+                    torch.set_num_threads(torch_threads)
+            except ImportError:
+                print("torch is not installed, using the NumPy networks")
+
+    @staticmethod
+    def instance() -> "NNManager":
+        """
+        Returns the registry shared by the whole process
+        """
+        if NNManager._instance is None:
+            NNManager._instance = NNManager()
+        return NNManager._instance
+
+    def get_network(self, stage: PokerGameStage) -> Network:
         """
         Returns the network for a given stage
         """
-        network = self.pre_flop_network
+        if stage not in [
+            PokerGameStage.FLOP,
+            PokerGameStage.TURN,
+            PokerGameStage.RIVER,
+        ]:
+            stage = PokerGameStage.PRE_FLOP
 
-        if stage == PokerGameStage.FLOP:
-            network = self.flop_network
-        elif stage == PokerGameStage.TURN:
-            network = self.turn_network
-        elif stage == PokerGameStage.RIVER:
-            network = self.river_network
+        if stage not in self.networks:
+            network = self.load_network(stage)
+            if NBR_BUCKETS > 0:
+                network = BucketedNetwork(network, CardAbstraction.for_stage(stage))
+            self.networks[stage] = network
 
-        return network
+        return self.networks[stage]
+
+    def load_networks(self):
+        """
+        Loads the network of every stage up front, rather than on first use
+        """
+        for stage in [
+            PokerGameStage.PRE_FLOP,
+            PokerGameStage.FLOP,
+            PokerGameStage.TURN,
+            PokerGameStage.RIVER,
+        ]:
+            self.get_network(stage)
+
+    def wrap_networks(self, wrapper: Callable[[Network], Network]):
+        """
+        Loads the network of every stage, and replaces it with wrapper(network),
+        e.g. to batch the evaluations of resolves running in several threads
+        """
+        self.load_networks()
+        for stage, network in list(self.networks.items()):
+            self.networks[stage] = wrapper(network)
+
+    def reload_network(self, stage: PokerGameStage):
+        """
+        Loads the newest checkpoint of a stage again, e.g. after it has been trained
+        """
+        self.networks.pop(stage, None)
+        self.get_network(stage)
 
-    def load_network(self, stage: PokerGameStage, version: int = -1) -> ValueNetwork:
-        nbr_public_cards = 0
-        if stage == PokerGameStage.FLOP:
-            nbr_public_cards = 3
-        elif stage == PokerGameStage.TURN:
-            nbr_public_cards = 4
-        elif stage == PokerGameStage.RIVER:
-            nbr_public_cards = 5
+    def load_network(self, stage: PokerGameStage, version: int = -1) -> Network:
+        """
+        Loads the given checkpoint version of the network for a stage,
+        using an untrained network if there are no checkpoints
 
-        network = ValueNetwork(1326, nbr_public_cards)
+        The network is put in eval mode, optionally quantized,
+        and warmed up with a forward pass
+        """
+        nbr_public_cards = public_info_size(stage)
 
-        try:
-            stage_dir = f"lightning_logs/{stage.name}/lightning_logs/"
-            folders = glob(stage_dir + "version_*")
-            if len(folders) == 0:
-                raise Exception("No folders for network")
+        if not self.use_torch:
+            return self.load_numpy_network(stage)
 
-            sorted_dirs = sorted(folders, key=os.path.getmtime)
+        from shallowstack.neural_net.model import ValueNetwork
 
-            dir = sorted_dirs[version]
+        checkpoint = find_checkpoint(stage, version)
+        if checkpoint is not None:
+            network = ValueNetwork.load_from_checkpoint(
+                checkpoint,
+                map_location="cpu",
+                range_size=network_range_size(),
+                public_info_size=nbr_public_cards,
+            )
+        else:
+            print(f"No trained network for {stage.name}, using an untrained one")
+            network = ValueNetwork(network_range_size(), nbr_public_cards)
 
-            f = glob(f"{dir}/checkpoints/*.ckpt")[0]
-            network.load_from_checkpoint(f)
-        except:
-            pass
+        network.eval()
+        if self.quantize:
+            network = network.quantized()
+
+        # The first forward pass is slower, so get it out of the way
+        network.predict_values_batch(np.zeros((1, network.input_size)))
 
         return network
+
+    def load_numpy_network(self, stage: PokerGameStage) -> NumpyValueNetwork:
+        """
+        Loads the network for a stage exported to EXPORT_DIR,
+        using an untrained network if it has not been exported
+        """
+        path = f"{EXPORT_DIR}/{stage.name}.npz"
+        if os.path.exists(path):
+            return NumpyValueNetwork.load(path)
+
+        print(f"No exported network for {stage.name}, using an untrained one")
+        return NumpyValueNetwork.random(network_range_size(), public_info_size(stage))
+
+    def export_networks(self, dest: str = EXPORT_DIR):
+        """
+        Exports the trained network of every stage to a .npz file
+        that can be run by NumpyValueNetwork
+
+        Stages without a checkpoint are skipped, so an untrained network
+        is never mistaken for a trained one
+        """
+        if not self.use_torch:
+            raise RuntimeError(
+                "Exporting the networks requires the torch backend and torch installed"
+            )
+        if self.quantize:
+            raise RuntimeError("Quantized networks can not be exported")
+
+        os.makedirs(dest, exist_ok=True)
+        for stage in [
+            PokerGameStage.PRE_FLOP,
+            PokerGameStage.FLOP,
+            PokerGameStage.TURN,
+            PokerGameStage.RIVER,
+        ]:
+            if find_checkpoint(stage) is None:
+                print(f"No trained network for {stage.name}, not exporting it")
+                continue
+
+            NumpyValueNetwork.export(
+                self.load_network(stage), f"{dest}/{stage.name}.npz"
+            )
+
+
+def find_checkpoint(stage: PokerGameStage, version: int = -1) -> Optional[str]:
+    """
+    Returns the path of the given checkpoint version for a stage,
+    or None if the stage has not been trained
+    """
+    stage_dir = f"lightning_logs/{stage.name}/lightning_logs/"
+    folders = glob(stage_dir + "version_*")
+    sorted_dirs = sorted(folders, key=os.path.getmtime)
+    if len(sorted_dirs) == 0:
+        return None
+
+    checkpoints = glob(f"{sorted_dirs[version]}/checkpoints/*.ckpt")
+    if len(checkpoints) == 0:
+        return None
+    return checkpoints[0]
+
+
+def public_info_size(stage: PokerGameStage) -> int:
+    """
+    Number of public cards in the network input for a stage
+    """
+    if stage == PokerGameStage.FLOP:
+        return 3
+    elif stage == PokerGameStage.TURN:
+        return 4
+    elif stage == PokerGameStage.RIVER:
+        return 5
+    return 0
@@ -1,6 +1,8 @@
 from lightning import Trainer
 from shallowstack.neural_net.datamodule import PokerDataModule
 from shallowstack.neural_net.model import ValueNetwork
+from shallowstack.neural_net.neural_net_manager import NNManager
+from shallowstack.poker.card_abstraction import network_range_size
 from shallowstack.state_manager.state_manager import PokerGameStage
 
 
@@ -31,7 +33,7 @@ class NNTrainer:
         elif stage == PokerGameStage.RIVER:
             nbr_public_cards = 5
 
-        network = ValueNetwork(1326, nbr_public_cards)
+        network = ValueNetwork(network_range_size(), nbr_public_cards)
         data = PokerDataModule(stage, 10, data_size, force_override=override_data)
         trainer = Trainer(
             max_epochs=max_epochs, default_root_dir=f"lightning_logs/{stage.name}"
@@ -39,6 +41,9 @@ class NNTrainer:
 
         trainer.fit(network, data)
 
+        # Data for the stages above is generated with this network
+        NNManager.instance().reload_network(stage)
+
     def train_all_networks(
         self, max_ephochs: int = 100, data_size: int = 100, override_river: bool = False
     ):
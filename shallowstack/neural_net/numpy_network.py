@@ -0,0 +1,101 @@
+from typing import List, Tuple
+
+import numpy as np
+
+LAYERS = ["fc1", "fc2", "fc3", "fc4", "value_output"]
+
+
+class NumpyValueNetwork:
+    """
+    Pure NumPy runtime for the value networks
+
+    Mirrors the inference API of ValueNetwork, but only needs the exported
+    weights, so bots can play without importing torch or lightning
+    """
+
+    def __init__(
+        self,
+        range_size: int,
+        public_info_size: int,
+        weights: List[np.ndarray],
+        biases: List[np.ndarray],
+    ):
+        self.range_size = range_size
+        self.public_info_size = public_info_size
+        self.input_size = range_size * 2 + public_info_size + 1
+
+        # Stored transposed, so a layer is x @ w + b
+        self.weights = [np.ascontiguousarray(w.T, dtype=np.float32) for w in weights]
+        self.biases = [b.astype(np.float32) for b in biases]
+
+    def predict_values(self, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the values of both players for a single input vector
+        """
+        v1, v2 = self.predict_values_batch(np.asarray(x).reshape(1, -1))
+        return v1[0], v2[0]
+
+    def predict_values_batch(self, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Takes a (batch, input_size) array, and returns the values
+        as two (batch, range_size) arrays
+        """
+        x = np.asarray(x, dtype=np.float32)
+        for w, b in zip(self.weights[:-1], self.biases[:-1]):
+            x = np.maximum(x @ w + b, 0)
+        values = x @ self.weights[-1] + self.biases[-1]
+
+        return values[:, : self.range_size], values[:, self.range_size :]
+
+    @staticmethod
+    def load(path: str) -> "NumpyValueNetwork":
+        """
+        Loads a network exported with NumpyValueNetwork.export
+        """
+        with np.load(path) as data:
+            return NumpyValueNetwork(
+                int(data["range_size"]),
+                int(data["public_info_size"]),
+                [data[f"{layer}.weight"] for layer in LAYERS],
+                [data[f"{layer}.bias"] for layer in LAYERS],
+            )
+
+    @staticmethod
+    def random(range_size: int, public_info_size: int) -> "NumpyValueNetwork":
+        """
+        Creates an untrained network, used when there is no exported network
+        """
+        sizes = [
+            range_size * 2 + public_info_size + 1,
+            256,
+            128,
+            64,
+            32,
+            range_size * 2,
+        ]
+        weights = []
+        biases = []
+        for n_in, n_out in zip(sizes, sizes[1:]):
+            bound = 1 / np.sqrt(n_in)
+            weights.append(np.random.uniform(-bound, bound, (n_out, n_in)))
+            biases.append(np.random.uniform(-bound, bound, n_out))
+
+        return NumpyValueNetwork(range_size, public_info_size, weights, biases)
+
+    @staticmethod
+    def export(network, path: str):
+        """
+        Writes the weights of a trained ValueNetwork to a compressed .npz file
+        """
+        state = network.state_dict()
+        arrays = {
+            name: state[name].detach().cpu().numpy().astype(np.float32)
+            for layer in LAYERS
+            for name in [f"{layer}.weight", f"{layer}.bias"]
+        }
+        np.savez_compressed(
+            path,
+            range_size=network.range_size,
+            public_info_size=network.public_info_size,
+            **arrays,
+        )
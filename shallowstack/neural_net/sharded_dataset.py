@@ -0,0 +1,115 @@
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import torch
+from torch.utils.data import IterableDataset, get_worker_info
+
+from shallowstack.neural_net.shards import load_manifest, shard_paths
+
+
+class ShardedDataset(IterableDataset):
+    """
+    Serves batches from the rows [start, stop) of a sharded dataset
+
+    The shards are memory-mapped, so only the rows of the current batches
+    are read, straight from the page cache. Nothing is loaded up front,
+    and splits are just index ranges over the same shards.
+
+    When shuffling, the shards are visited in random order, and the rows of
+    shards_per_group shards at a time are shuffled together, so batches mix
+    rows within and across shards. With several loader workers, each worker
+    serves its own share of the shards.
+
+    An augmentation can be applied to every batch, e.g. SuitAugmentation
+    """
+
+    def __init__(
+        self,
+        data_dir: str,
+        start: int,
+        stop: int,
+        batch_size: int,
+        shuffle: bool = False,
+        shards_per_group: int = 2,
+        augmentation: Optional[
+            Callable[[np.ndarray, np.random.Generator], np.ndarray]
+        ] = None,
+    ):
+        super().__init__()
+        self.data_dir = data_dir
+        self.start = start
+        self.stop = stop
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.shards_per_group = shards_per_group
+        self.augmentation = augmentation
+
+        self.paths = shard_paths(data_dir)
+        rows = [shard["rows"] for shard in load_manifest(data_dir)["shards"]]
+        self.offsets = np.cumsum([0] + rows)
+        # Mapped when iterating, so the maps are never pickled to the workers
+        self.shards: Optional[List[np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return int(np.ceil((self.stop - self.start) / self.batch_size))
+
+    def segments(self) -> List[Tuple[int, np.ndarray]]:
+        """
+        The rows of the split in every shard, as (shard, rows) pairs
+        """
+        segments = []
+        for i in range(len(self.paths)):
+            first = max(self.start - self.offsets[i], 0)
+            last = min(
+                self.stop - self.offsets[i], self.offsets[i + 1] - self.offsets[i]
+            )
+            if first < last:
+                segments.append((i, np.arange(first, last)))
+        return segments
+
+    def __iter__(self) -> Iterator[torch.Tensor]:
+        if self.shards is None:
+            self.shards = [np.load(path, mmap_mode="r") for path in self.paths]
+        segments = self.segments()
+
+        worker = get_worker_info()
+        if worker is not None:
+            segments = segments[worker.id :: worker.num_workers]
+
+        # The torch seed differs between workers and epochs
+        rng = np.random.default_rng(torch.randint(0, 2**31 - 1, (1,)).item())
+
+        if not self.shuffle:
+            for shard, rows in segments:
+                for i in range(0, len(rows), self.batch_size):
+                    yield self.read_batch([shard], [rows[i : i + self.batch_size]], rng)
+            return
+
+        order = rng.permutation(len(segments))
+        for g in range(0, len(order), self.shards_per_group):
+            group = [segments[i] for i in order[g : g + self.shards_per_group]]
+            shard_ids = np.concatenate(
+                [np.full(len(rows), shard) for shard, rows in group]
+            )
+            rows = np.concatenate([rows for _, rows in group])
+            permutation = rng.permutation(len(rows))
+            shard_ids, rows = shard_ids[permutation], rows[permutation]
+
+            for i in range(0, len(rows), self.batch_size):
+                batch_shards = shard_ids[i : i + self.batch_size]
+                batch_rows = rows[i : i + self.batch_size]
+                shards = list(np.unique(batch_shards))
+                yield self.read_batch(
+                    shards, [batch_rows[batch_shards == s] for s in shards], rng
+                )
+
+    def read_batch(
+        self, shards: List[int], rows: List[np.ndarray], rng: np.random.Generator
+    ) -> torch.Tensor:
+        # Sorted rows read the memory map front to back
+        batch = np.concatenate(
+            [self.shards[s][np.sort(r)] for s, r in zip(shards, rows)]
+        )
+        if self.augmentation is not None:
+            batch = self.augmentation(batch, rng)
+        return torch.from_numpy(batch)
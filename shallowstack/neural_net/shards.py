@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+from typing import Dict, List
+
+import numpy as np
+
+MANIFEST = "manifest.json"
+
+
+def load_manifest(data_dir: str) -> Dict:
+    """
+    Loads the manifest of a sharded dataset
+    """
+    with open(f"{data_dir}/{MANIFEST}") as f:
+        return json.load(f)
+
+
+def shard_paths(data_dir: str) -> List[str]:
+    """
+    Returns the paths of the completed shards of a dataset, in order
+    """
+    manifest = load_manifest(data_dir)
+    return [f"{data_dir}/{shard['file']}" for shard in manifest["shards"]]
+
+
+def count_duplicate_rows(data_dir: str) -> int:
+    """
+    Counts the examples of a dataset that are exact copies of an earlier one
+    """
+    seen = set()
+    duplicates = 0
+    for path in shard_paths(data_dir):
+        for row in np.load(path, mmap_mode="r"):
+            digest = hashlib.blake2b(row.tobytes(), digest_size=16).digest()
+            if digest in seen:
+                duplicates += 1
+            seen.add(digest)
+    return duplicates
+
+
+class ShardWriter:
+    """
+    Writes examples to a dataset of fixed size float32 .npy shards
+
+    Examples are collected in a preallocated shard buffer, and every shard
+    is written to disk as soon as it is full. The manifest lists the
+    completed shards, so an interrupted generation can be resumed
+    where it stopped without keeping the whole dataset in memory
+    """
+
+    def __init__(self, data_dir: str, row_size: int, shard_size: int):
+        self.data_dir = data_dir
+        self.row_size = row_size
+        self.shard_size = shard_size
+
+        os.makedirs(data_dir, exist_ok=True)
+        if os.path.exists(f"{data_dir}/{MANIFEST}"):
+            self.manifest = load_manifest(data_dir)
+            if self.manifest["row_size"] != row_size:
+                raise ValueError(
+                    f"The dataset in {data_dir} has rows of size "
+                    f"{self.manifest['row_size']}, not {row_size}"
+                )
+        else:
+            self.manifest = {
+                "row_size": row_size,
+                "dtype": "float32",
+                "size": 0,
+                "shards": [],
+            }
+
+        self.buffer = np.zeros((shard_size, row_size), dtype=np.float32)
+        self.buffered = 0
+
+    @property
+    def size(self) -> int:
+        """
+        Number of examples in completed shards
+        """
+        return self.manifest["size"]
+
+    def add(self, example: np.ndarray):
+        self.buffer[self.buffered] = example
+        self.buffered += 1
+        if self.buffered == self.shard_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered examples as a new shard
+        """
+        if self.buffered == 0:
+            return
+
+        file = f"shard_{len(self.manifest['shards']):05d}.npy"
+        # Written under a temporary name, so a crash never leaves half a shard
+        tmp_path = f"{self.data_dir}/{file}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, self.buffer[: self.buffered])
+        os.replace(tmp_path, f"{self.data_dir}/{file}")
+
+        self.manifest["shards"].append({"file": file, "rows": self.buffered})
+        self.manifest["size"] += self.buffered
+        self.buffered = 0
+        self.write_manifest()
+
+    def write_manifest(self):
+        tmp_path = f"{self.data_dir}/{MANIFEST}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, f"{self.data_dir}/{MANIFEST}")
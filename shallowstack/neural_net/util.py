@@ -1,22 +1,163 @@
-import torch
+from __future__ import annotations
+
+import threading
+
 import numpy as np
-from typing import List
+from typing import TYPE_CHECKING, Dict, List, Tuple
 
 from shallowstack.poker.card import Card
 
+if TYPE_CHECKING:
+    import torch
+
+
+class InputEncoder:
+    """
+    Encodes situations as network input vectors, and examples for training
+
+    Every row is written straight into a preallocated float32 buffer:
+    player 1 range, player 2 range, public card ids and the pot.
+    The buffers are reused across calls and only grow when a larger batch
+    is encoded, so the returned arrays are only valid until the next call.
+
+    Use InputEncoder.for_size to get the encoder shared by the thread.
+    Every thread has its own encoders, so resolves running in several
+    threads never write over each other's buffers
+    """
+
+    _local = threading.local()
+
+    def __init__(self, range_size: int = 1326, public_info_size: int = 0):
+        self.range_size = range_size
+        self.public_info_size = public_info_size
+        self.input_size = range_size * 2 + public_info_size + 1
+        self.output_size = range_size * 2 + 1
+
+        self.inputs = np.zeros((0, self.input_size), dtype=np.float32)
+        self.examples = np.zeros(
+            (0, self.input_size + self.output_size), dtype=np.float32
+        )
+
+    @staticmethod
+    def for_size(public_info_size: int, range_size: int = 1326) -> "InputEncoder":
+        """
+        Returns the encoder shared by the thread for the given input size
+        """
+        if not hasattr(InputEncoder._local, "encoders"):
+            InputEncoder._local.encoders = {}
+        encoders: Dict[Tuple[int, int], "InputEncoder"] = InputEncoder._local.encoders
+        key = (range_size, public_info_size)
+        if key not in encoders:
+            encoders[key] = InputEncoder(range_size, public_info_size)
+        return encoders[key]
+
+    def encode(
+        self,
+        r1: np.ndarray,
+        r2: np.ndarray,
+        public_cards: List[List[Card]],
+        pots: List[float],
+    ) -> np.ndarray:
+        """
+        Encodes a batch of situations, with one row of ranges per situation
+
+        Returns a (batch, input_size) view of the input buffer
+        """
+        n = len(pots)
+        if self.inputs.shape[0] < n:
+            self.inputs = np.zeros((n, self.input_size), dtype=np.float32)
+
+        x = self.inputs[:n]
+        self.write_inputs(x, r1, r2, public_cards, pots)
+        return x
+
+    def encode_public(
+        self, r1: np.ndarray, r2: np.ndarray, public_input: np.ndarray
+    ) -> np.ndarray:
+        """
+        Like encode, but with the public card ids and pots
+        already given as a (batch, public_info_size + 1) array
+        """
+        n = public_input.shape[0]
+        if self.inputs.shape[0] < n:
+            self.inputs = np.zeros((n, self.input_size), dtype=np.float32)
+
+        x = self.inputs[:n]
+        x[:, : self.range_size] = r1
+        x[:, self.range_size : 2 * self.range_size] = r2
+        x[:, 2 * self.range_size :] = public_input
+        return x
+
+    def encode_examples(
+        self,
+        r1: np.ndarray,
+        r2: np.ndarray,
+        public_cards: List[List[Card]],
+        pots: List[float],
+        v1: np.ndarray,
+        v2: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Encodes a batch of training examples, each being the input vector
+        followed by the target values and a zero dot sum
+
+        Returns a (batch, input_size + output_size) view of the example buffer
+        """
+        n = len(pots)
+        if self.examples.shape[0] < n:
+            self.examples = np.zeros(
+                (n, self.input_size + self.output_size), dtype=np.float32
+            )
+
+        examples = self.examples[:n]
+        self.write_inputs(examples[:, : self.input_size], r1, r2, public_cards, pots)
+
+        y = examples[:, self.input_size :]
+        y[:, : self.range_size] = v1
+        y[:, self.range_size : 2 * self.range_size] = v2
+        y[:, -1] = 0
+        return examples
+
+    def write_inputs(
+        self,
+        x: np.ndarray,
+        r1: np.ndarray,
+        r2: np.ndarray,
+        public_cards: List[List[Card]],
+        pots: List[float],
+    ):
+        """
+        Writes the input vectors of a batch of situations into x
+        """
+        x[:, : self.range_size] = r1
+        x[:, self.range_size : 2 * self.range_size] = r2
+        for i, cards in enumerate(public_cards):
+            for j, card in enumerate(cards):
+                x[i, 2 * self.range_size + j] = card.id
+        x[:, -1] = pots
+
 
 def create_input_vector(
     r1: np.ndarray, r2: np.ndarray, public_cards: List[Card], pot: int
 ) -> torch.Tensor:
-    r1_t = torch.Tensor(r1).reshape(1, -1)
-    r2_t = torch.Tensor(r2).reshape(1, -1)
-    public_cards_t = torch.Tensor([card.id for card in public_cards]).reshape(1, -1)
-    pot_t = torch.Tensor([pot]).reshape(1, -1)
+    """
+    Creates the input vector for a single situation as a (1, input_size) tensor
+    """
+    # torch is imported where it is needed, so inference can run without it
+    import torch
 
-    return torch.cat([r1_t, r2_t, public_cards_t, pot_t], dim=1)
+    encoder = InputEncoder.for_size(len(public_cards), r1.size)
+    x = encoder.encode(r1, r2, [public_cards], [pot])
+    # Copied, as the buffer is overwritten by the next encoding
+    return torch.from_numpy(x.copy())
 
 
 def create_output_vector(
     v1: torch.Tensor, v2: torch.Tensor, dot_sum: torch.Tensor
 ) -> torch.Tensor:
+    """
+    Concatenates the output of the network in the training graph
+    """
+    import torch
+
     return torch.cat([v1, v2, dot_sum], dim=1)
@@ -1,13 +1,23 @@
+import asyncio
+from typing import Any, Dict, Optional, Tuple
+
 import numpy as np
 from shallowstack.config.config import RESOLVER_CONFIG
 from shallowstack.game.action import AGENT_ACTIONS, ALLOWED_RAISES, Action, ActionType
 from shallowstack.poker.poker_oracle import PokerOracle
-from shallowstack.resolver.resolver import Resolver
+from shallowstack.resolver.async_resolver import AsyncResolver
+from shallowstack.resolver.resolver import ResolveResult, Resolver
 from shallowstack.state_manager import GameState, PokerGameStage
 from shallowstack.player.player import Player
 from shallowstack.state_manager.state_manager import StateManager
+from shallowstack.subtree.profiler import PROFILE
 from shallowstack.subtree.subtree_manager import SubtreeManager
 
+NBR_ROLLOUTS = RESOLVER_CONFIG.getint("NBR_ROLLOUTS")
+# Seconds per resolved decision, 0 runs NBR_ROLLOUTS iterations instead
+RESOLVE_TIME_BUDGET = RESOLVER_CONFIG.getfloat("RESOLVE_TIME_BUDGET", 0.0)
+MAX_ROLLOUTS = RESOLVER_CONFIG.getint("MAX_ROLLOUTS", 1000)
+
 
 class HybridPlayer(Player):
     def __init__(
@@ -16,6 +26,8 @@ class HybridPlayer(Player):
         resolve_probability: float = 0.5,
         range_size: int = 1326,
         show_internals: bool = False,
+        time_budget: float = RESOLVE_TIME_BUDGET,
+        async_resolver: Optional[AsyncResolver] = None,
     ):
         super().__init__(name)
 
@@ -31,6 +43,9 @@ class HybridPlayer(Player):
 
         self.resolve_probability = resolve_probability
         self.show_internals = show_internals
+        self.time_budget = time_budget
+        # Created on first use by get_action_async, and can be shared by players
+        self.async_resolver = async_resolver
 
     def get_action(self, game_state: GameState) -> Action:
         """
@@ -71,10 +86,33 @@ class HybridPlayer(Player):
         else:
             return Action(ActionType.RAISE, np.random.choice(ALLOWED_RAISES))
 
+    async def get_action_async(self, game_state: GameState) -> Action:
+        """
+        Decides on an action like get_action, without blocking the event loop.
+        Resolves run in the worker processes of the async resolver
+        """
+        if np.random.random() < self.resolve_probability:
+            if self.async_resolver is None:
+                self.async_resolver = AsyncResolver()
+            args, kwargs = self.resolve_arguments(game_state)
+            result = await self.async_resolver.resolve(*args, **kwargs)
+            return self.apply_resolve_result(result)
+        else:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.rollout_action, game_state)
+
     def resolve_action(self, game_state: GameState) -> Action:
         """
         Handles logic for using resolve based strategy
         """
+        args, kwargs = self.resolve_arguments(game_state)
+        result = self.resolver.resolve(*args, **kwargs)
+        return self.apply_resolve_result(result)
+
+    def resolve_arguments(self, game_state: GameState) -> Tuple[Tuple, Dict[str, Any]]:
+        """
+        Arguments of the resolve for the state, for Resolver and AsyncResolver
+        """
         current_stage = game_state.stage
         end_depth = 0
         if current_stage.value < PokerGameStage.RIVER.value:
@@ -83,22 +121,35 @@ class HybridPlayer(Player):
             end_stage = current_stage
             end_depth = 10
 
-        nbr_rollouts = RESOLVER_CONFIG.getint("NBR_ROLLOUTS")
+        if self.time_budget > 0:
+            nbr_rollouts, time_budget = MAX_ROLLOUTS, self.time_budget
+        else:
+            nbr_rollouts, time_budget = NBR_ROLLOUTS, None
+
+        args = (game_state, self.r1, self.r2, end_stage, end_depth, nbr_rollouts)
+        kwargs = {
+            "show_internal_values": self.show_internals,
+            "time_budget": time_budget,
+            # The phases of the resolve are printed with the internals
+            "profile": PROFILE or self.show_internals,
+        }
+        return args, kwargs
+
+    def apply_resolve_result(self, result: ResolveResult) -> Action:
+        """
+        Updates the ranges and opponent strategy from a resolve, returning its action
+        """
+        self.r1, self.r2 = result.r1, result.r2
+        self.opponent_strategy = result.strategy
 
-        action, self.r1, self.r2, self.opponent_strategy = self.resolver.resolve(
-            game_state,
-            self.r1,
-            self.r2,
-            end_stage,
-            end_depth,
-            nbr_rollouts,
-            self.show_internals,
-        )
+        if self.show_internals:
+            print(f"{result.iterations} iterations")
 
-        return action
+        return result.action
 
     def prepare_for_new_round(self):
         super().prepare_for_new_round()
+        self.resolver.reset()
         self.r1 = np.ones(self.range_size) / self.range_size
         self.r2 = np.ones(self.range_size) / self.range_size
 
@@ -1,5 +1,5 @@
 from os import stat
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 import numpy as np
 
 
@@ -100,12 +100,22 @@ def hole_card_ids_from_pair_idx(idx: int) -> Tuple[int, int]:
 
 
 class Deck:
-    def __init__(self, low_card_value: int = 2, high_card_value: int = 14):
+    def __init__(
+        self,
+        low_card_value: int = 2,
+        high_card_value: int = 14,
+        rng: Optional[np.random.Generator] = None,
+    ):
+        """
+        rng: The generator cards are drawn with, defaults to the global numpy one.
+            Copies of the deck share the generator, so they draw from the same stream
+        """
         nr_cards_per_suit = high_card_value - low_card_value + 1
         nr_cards = nr_cards_per_suit * 4
 
         self.low_card_value = low_card_value
         self.high_card_value = high_card_value
+        self.rng = rng
         self.card_distribution = np.ones(nr_cards) / nr_cards
         self.cards = [
             Card(NUM_SUIT_DICT[i], NUM_RANK_DICT[j])
@@ -117,7 +127,8 @@ class Deck:
         # Draw random indices from the card distribution
         if np.sum(self.card_distribution) == 0:
             raise Exception("No cards left in deck")
-        indices = np.random.choice(
+        rng = self.rng if self.rng is not None else np.random
+        indices = rng.choice(
             len(self.card_distribution),
             nr_cards,
             replace=False,
@@ -136,10 +147,14 @@ class Deck:
         return [self.cards[i] for i in indices]
 
     def copy(self):
-        new_deck = Deck(self.low_card_value, self.high_card_value)
+        new_deck = Deck(self.low_card_value, self.high_card_value, self.rng)
         new_deck.card_distribution = self.card_distribution.copy()
         return new_deck
 
+    def __deepcopy__(self, memo) -> "Deck":
+        # Game states are deep copied, which must not duplicate the generator
+        return self.copy()
+
     def remove_cards(self, cards: List[Card]):
         for card in cards:
             self.card_distribution[card.id] = 0
@@ -0,0 +1,305 @@
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from shallowstack.config.config import ABSTRACTION_CONFIG
+from shallowstack.poker.card import Card, Deck, hole_card_ids_from_pair_idx
+from shallowstack.poker.poker_oracle import PokerOracle
+from shallowstack.state_manager.state_manager import PokerGameStage
+
+NBR_BUCKETS = ABSTRACTION_CONFIG.getint("NBR_BUCKETS", 0)
+NBR_EQUITY_BINS = ABSTRACTION_CONFIG.getint("NBR_EQUITY_BINS", 10)
+NBR_EQUITY_ROLLOUTS = ABSTRACTION_CONFIG.getint("NBR_EQUITY_ROLLOUTS", 20)
+ABSTRACTION_DIR = ABSTRACTION_CONFIG.get("ABSTRACTION_DIR", "abstraction")
+
+RANGE_SIZE = 1326
+
+# The two card ids of every hole pair, and the hole pairs holding each card
+HOLE_CARD_IDS = np.array([hole_card_ids_from_pair_idx(i) for i in range(RANGE_SIZE)])
+HANDS_WITH_CARD = [np.nonzero(np.any(HOLE_CARD_IDS == c, axis=1))[0] for c in range(52)]
+
+
+def network_range_size() -> int:
+    """
+    Size of the ranges and values the networks work on
+    """
+    return NBR_BUCKETS if NBR_BUCKETS > 0 else RANGE_SIZE
+
+
+def public_card_count(stage: PokerGameStage) -> int:
+    if stage == PokerGameStage.FLOP:
+        return 3
+    elif stage == PokerGameStage.TURN:
+        return 4
+    elif stage == PokerGameStage.RIVER:
+        return 5
+    return 0
+
+
+def valid_hands(card_ids: List[int]) -> np.ndarray:
+    """
+    Mask of the hole pairs not blocked by the given cards
+    """
+    if len(card_ids) == 0:
+        return np.ones(RANGE_SIZE, dtype=bool)
+    return ~np.any(np.isin(HOLE_CARD_IDS, card_ids), axis=1)
+
+
+def river_equities(board: List[Card]) -> np.ndarray:
+    """
+    Equity of every hole pair against a uniform opponent range on a full board,
+    counting ties as half. Blocked hole pairs get an equity of 0
+
+    The hands beaten and tied are counted by sorting the hand strengths,
+    and the opponent hands sharing a card with the hole pair are taken out
+    """
+    strengths = PokerOracle.hand_strengths(board)
+    valid = valid_hands([card.id for card in board])
+
+    score = np.zeros(RANGE_SIZE)
+    opponents = np.zeros(RANGE_SIZE)
+    hands = np.nonzero(valid)[0]
+    score[hands] = hand_scores(strengths[hands])
+    opponents[hands] = len(hands)
+    for c in range(52):
+        # Hands with the card were counted for every hand holding it
+        with_card = HANDS_WITH_CARD[c][valid[HANDS_WITH_CARD[c]]]
+        score[with_card] -= hand_scores(strengths[with_card])
+        opponents[with_card] -= len(with_card)
+
+    # The hole pair was taken out once too many, along with its tie with itself
+    score[hands] += 0.5
+    opponents[hands] += 1
+
+    equities = score / np.maximum(opponents, 1)
+    equities[~valid] = 0
+    return equities
+
+
+def hand_scores(strengths: np.ndarray) -> np.ndarray:
+    """
+    Number of the hands beaten by each hand, counting ties as half,
+    where lower strengths are better
+    """
+    ordered = np.sort(strengths)
+    worse = len(ordered) - np.searchsorted(ordered, strengths, side="right")
+    tied = np.searchsorted(ordered, strengths, side="right") - np.searchsorted(
+        ordered, strengths, side="left"
+    )
+    return worse + 0.5 * tied
+
+
+def board_rng(public_cards: List[Card]) -> np.random.Generator:
+    """
+    Generator seeded by the board, the same in every process
+    """
+    ids = sorted(card.id for card in public_cards)
+    return np.random.default_rng([len(ids), *ids])
+
+
+def equity_histograms(
+    public_cards: List[Card],
+    nbr_bins: int = NBR_EQUITY_BINS,
+    nbr_rollouts: int = NBR_EQUITY_ROLLOUTS,
+    rng: Optional[np.random.Generator] = None,
+) -> np.ndarray:
+    """
+    Distribution of the river equity of every hole pair, over random
+    completions of the board, as a (1326, nbr_bins) array
+
+    The completions are drawn with rng, which defaults to a generator seeded
+    by the board, so a board always gets the same histograms, whichever
+    process computes them.
+    On the river the equity is known, so every histogram has a single bin set
+    """
+    missing = 5 - len(public_cards)
+    if missing == 0:
+        nbr_rollouts = 1
+    if rng is None:
+        rng = board_rng(public_cards)
+
+    histograms = np.zeros((RANGE_SIZE, nbr_bins))
+    for _ in range(nbr_rollouts):
+        deck = Deck(rng=rng)
+        deck.remove_cards(public_cards)
+        board = public_cards + deck.draw(missing)
+
+        equities = river_equities(board)
+        bins = np.minimum((equities * nbr_bins).astype(int), nbr_bins - 1)
+        valid = valid_hands([card.id for card in board])
+        histograms[np.nonzero(valid)[0], bins[valid]] += 1
+
+    total = histograms.sum(axis=1, keepdims=True)
+    return histograms / np.maximum(total, 1)
+
+
+def kmeans(
+    points: np.ndarray,
+    k: int,
+    nbr_iterations: int = 50,
+    rng: Optional[np.random.Generator] = None,
+) -> np.ndarray:
+    """
+    Clusters the points into k clusters, returning the (k, dim) centroids
+
+    The centroids are initialized with k-means++
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    centroids = np.zeros((k, points.shape[1]))
+    centroids[0] = points[rng.integers(len(points))]
+    distances = ((points - centroids[0]) ** 2).sum(axis=1)
+    for c in range(1, k):
+        p = distances / distances.sum() if distances.sum() > 0 else None
+        centroids[c] = points[rng.choice(len(points), p=p)]
+        distances = np.minimum(distances, ((points - centroids[c]) ** 2).sum(axis=1))
+
+    for _ in range(nbr_iterations):
+        assignment = nearest_centroid(points, centroids)
+        new_centroids = centroids.copy()
+        for c in range(k):
+            members = points[assignment == c]
+            if len(members) > 0:
+                new_centroids[c] = members.mean(axis=0)
+        if np.allclose(new_centroids, centroids):
+            break
+        centroids = new_centroids
+
+    return centroids
+
+
+def nearest_centroid(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    distances = (
+        (points**2).sum(axis=1)[:, None]
+        - 2 * points @ centroids.T
+        + (centroids**2).sum(axis=1)[None, :]
+    )
+    return np.argmin(distances, axis=1)
+
+
+class CardAbstraction:
+    """
+    Groups the hole pairs of a stage into buckets of hands with similar
+    equity distributions, so ranges and values can be handled as
+    NBR_BUCKETS long vectors instead of 1326 long ones
+
+    Hands are compared by the cumulative histograms of their equity,
+    where euclidean distance is close to the earth mover's distance.
+    The buckets are sorted by expected equity, so bucket 0 is the weakest.
+
+    Bucket tables map every hole pair to a bucket for a given board,
+    with the hole pairs blocked by the board in the extra bucket nbr_buckets.
+    They are cached per board, and are the same in every process
+    """
+
+    _abstractions: Dict[PokerGameStage, "CardAbstraction"] = {}
+
+    def __init__(self, stage: PokerGameStage, centroids: np.ndarray):
+        self.stage = stage
+        self.centroids = centroids
+        self.nbr_buckets = centroids.shape[0]
+        self.nbr_bins = centroids.shape[1]
+        self.tables: Dict[Tuple[int, ...], np.ndarray] = {}
+
+    @staticmethod
+    def fit(
+        stage: PokerGameStage,
+        nbr_buckets: int = NBR_BUCKETS,
+        nbr_boards: int = 50,
+        nbr_bins: int = NBR_EQUITY_BINS,
+        rng: Optional[np.random.Generator] = None,
+    ) -> "CardAbstraction":
+        """
+        Clusters the hands of random boards of the given stage
+
+        rng draws the boards, their completions and the initial centroids,
+        so a seeded fit always gives the same abstraction
+        """
+        nbr_public_cards = public_card_count(stage)
+        if stage == PokerGameStage.PRE_FLOP:
+            # There is only one pre-flop board
+            nbr_boards = 1
+
+        points = []
+        for _ in range(nbr_boards):
+            board = Deck(rng=rng).draw(nbr_public_cards)
+            valid = valid_hands([card.id for card in board])
+            points.append(equity_histograms(board, nbr_bins, rng=rng)[valid])
+        cumulative = np.cumsum(np.concatenate(points), axis=1)
+
+        centroids = kmeans(cumulative, nbr_buckets, rng=rng)
+        # The last cumulative bin is always 1, so lower sums mean higher equity
+        order = np.argsort(-centroids.sum(axis=1))
+        return CardAbstraction(stage, centroids[order])
+
+    def save(self, path: str):
+        np.savez_compressed(path, centroids=self.centroids)
+
+    @staticmethod
+    def load(stage: PokerGameStage, path: str) -> "CardAbstraction":
+        with np.load(path) as data:
+            return CardAbstraction(stage, data["centroids"])
+
+    @staticmethod
+    def for_stage(stage: PokerGameStage) -> "CardAbstraction":
+        """
+        Returns the abstraction of a stage stored in ABSTRACTION_DIR,
+        loaded once per process
+        """
+        if stage not in CardAbstraction._abstractions:
+            path = f"{ABSTRACTION_DIR}/{stage.name}.npz"
+            if not os.path.exists(path):
+                raise FileNotFoundError(
+                    f"No card abstraction for {stage.name}, "
+                    "generate it with the fit-abstraction command"
+                )
+            CardAbstraction._abstractions[stage] = CardAbstraction.load(stage, path)
+        return CardAbstraction._abstractions[stage]
+
+    def bucket_table(self, card_ids: List[int]) -> np.ndarray:
+        """
+        Returns the bucket of every hole pair on the board with the given card ids
+        """
+        key = tuple(sorted(int(c) for c in card_ids))
+        table = self.tables.get(key)
+        if table is None:
+            board = [Card.from_id(c) for c in key]
+            histograms = equity_histograms(board, self.nbr_bins)
+            table = nearest_centroid(np.cumsum(histograms, axis=1), self.centroids)
+            table[~valid_hands(list(key))] = self.nbr_buckets
+            self.tables[key] = table
+
+        return table
+
+    def bucket_ranges(self, ranges: np.ndarray, tables: np.ndarray) -> np.ndarray:
+        """
+        Sums (n, 1326) ranges into (n, nbr_buckets) bucket ranges,
+        with one bucket table per range
+        """
+        return self.bucket_sums(ranges, tables)
+
+    def bucket_values(
+        self, values: np.ndarray, ranges: np.ndarray, tables: np.ndarray
+    ) -> np.ndarray:
+        """
+        Averages (n, 1326) hand values into (n, nbr_buckets) bucket values,
+        weighted by the ranges
+        """
+        # Hands out of range still count a little, so no bucket is left without a value
+        weights = ranges + 1e-9
+        total = self.bucket_sums(weights, tables)
+        return self.bucket_sums(weights * values, tables) / np.maximum(total, 1e-12)
+
+    def expand_values(self, values: np.ndarray, tables: np.ndarray) -> np.ndarray:
+        """
+        Gives every hand the value of its bucket, and blocked hands a value of 0
+        """
+        padded = np.concatenate([values, np.zeros((values.shape[0], 1))], axis=1)
+        return np.take_along_axis(padded, tables, axis=1)
+
+    def bucket_sums(self, x: np.ndarray, tables: np.ndarray) -> np.ndarray:
+        n = x.shape[0]
+        width = self.nbr_buckets + 1
+        offsets = tables + width * np.arange(n)[:, None]
+        sums = np.bincount(offsets.ravel(), weights=x.ravel(), minlength=n * width)
+        return sums.reshape(n, width)[:, : self.nbr_buckets]
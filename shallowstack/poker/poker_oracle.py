@@ -46,6 +46,19 @@ class PokerOracle:
 
         a value of 1 at (i, j) means that hole card i wins over hole card j
         """
+        hand_strenghts = PokerOracle.hand_strengths(public_cards, range_length)
+        m = np.sign(-np.subtract.outer(hand_strenghts, hand_strenghts))
+        return m
+
+    @staticmethod
+    def hand_strengths(
+        public_cards: List[Card],
+        range_length: int = 1326,
+    ) -> np.ndarray:
+        """
+        Ranking of every hole pair with the public cards, lower is better.
+        Hole pairs blocked by the public cards get 0
+        """
         hand_strenghts = np.zeros(range_length)
         for i in range(range_length):
             h1_ids = hole_card_ids_from_pair_idx(i)
@@ -61,8 +74,7 @@ class PokerOracle:
 
             hand_strenghts[i] = PokerOracle.evaluate_hand(hand + public_cards)
 
-        m = np.sign(-np.subtract.outer(hand_strenghts, hand_strenghts))
-        return m
+        return hand_strenghts
 
     @staticmethod
     def hand_to_hand_type(hand: List[Card]) -> PokerHandType:
@@ -1 +1,2 @@
-from shallowstack.resolver.resolver import Resolver
\ No newline at end of file
+from shallowstack.resolver.async_resolver import AsyncResolver
+from shallowstack.resolver.resolver import Resolver
@@ -0,0 +1,116 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from multiprocessing.managers import SyncManager
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from shallowstack.config.config import RESOLVER_CONFIG
+from shallowstack.neural_net.neural_net_manager import NNManager
+from shallowstack.resolver.resolver import ResolveResult, Resolver
+from shallowstack.state_manager.state_manager import GameState, PokerGameStage
+from shallowstack.subtree.parallel import init_worker
+
+# Worker processes shared by the resolves of an AsyncResolver, 0 uses one per core
+ASYNC_WORKERS = RESOLVER_CONFIG.getint("ASYNC_WORKERS", 0)
+# Seconds a resolve may run past its deadline, before it is given up on
+DEADLINE_GRACE = RESOLVER_CONFIG.getfloat("DEADLINE_GRACE", 1.0)
+
+
+def _resolve(
+    stop: Any, end: Optional[float], args: Tuple, kwargs: Dict[str, Any]
+) -> ResolveResult:
+    """
+    Runs a resolve in a worker process, until it is done or stop is set
+
+    With an end time, the time budget is what is left of it when the resolve
+    starts, as it may have waited for a free worker
+    """
+    if end is not None:
+        kwargs["time_budget"] = max(end - time.time(), 0.0)
+    return Resolver().resolve(*args, should_stop=stop.is_set, **kwargs)
+
+
+class AsyncResolver:
+    """
+    Runs resolves in worker processes, so an event loop can keep serving
+    other tables and I/O while they think
+
+    resolve returns an asyncio future. Cancelling it, or missing its deadline,
+    stops the resolve in its worker after the current iteration.
+
+    Every resolve runs with a fresh Resolver in whichever worker is free,
+    so resolves are not warm started from the previous one of the hand
+    """
+
+    def __init__(self, workers: int = ASYNC_WORKERS):
+        # Loaded before the workers are forked, so they share the networks,
+        # and a first resolve does not spend its deadline loading them
+        NNManager.instance().load_networks()
+
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        self.executor = ProcessPoolExecutor(
+            workers if workers > 0 else os.cpu_count(),
+            mp_context=context,
+            initializer=init_worker,
+        )
+        # The stop events are shared with the workers through a manager
+        self.manager = SyncManager(ctx=context)
+        self.manager.start()
+
+    def resolve(
+        self,
+        state: GameState,
+        r1: np.ndarray,
+        r2: np.ndarray,
+        end_stage: PokerGameStage,
+        end_depth: int,
+        nbr_rollouts: int,
+        deadline: Optional[float] = None,
+        **kwargs,
+    ) -> "asyncio.Future[ResolveResult]":
+        """
+        Starts a resolve, see Resolver.resolve for the arguments
+
+        With a deadline in seconds from now, the resolve is given the time left
+        until the deadline when it starts, so time spent waiting for a free
+        worker counts. If it has not finished DEADLINE_GRACE seconds after the
+        deadline, the future raises asyncio.TimeoutError instead
+        """
+        loop = asyncio.get_running_loop()
+        # Wall clock time, as the deadline is passed to another process
+        end = time.time() + deadline if deadline is not None else None
+
+        stop = self.manager.Event()
+        future = loop.run_in_executor(
+            self.executor,
+            _resolve,
+            stop,
+            end,
+            (state, r1, r2, end_stage, end_depth, nbr_rollouts),
+            kwargs,
+        )
+        return asyncio.ensure_future(self.wait(future, stop, deadline))
+
+    @staticmethod
+    async def wait(
+        future: "asyncio.Future[ResolveResult]",
+        stop: Any,
+        deadline: Optional[float],
+    ) -> ResolveResult:
+        try:
+            if deadline is None:
+                return await future
+            return await asyncio.wait_for(future, deadline + DEADLINE_GRACE)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            # A running resolve can not be cancelled from here, so it is told to stop
+            stop.set()
+            raise
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+        self.manager.shutdown()
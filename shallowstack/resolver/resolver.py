@@ -1,12 +1,71 @@
-from typing import Tuple
+from enum import Enum
+import time
+from typing import Callable, List, NamedTuple, Optional, Tuple, Union
 import numpy as np
+from shallowstack.config.config import RESOLVER_CONFIG
 from shallowstack.game.action import AGENT_ACTIONS, Action
 
 from shallowstack.state_manager.state_manager import GameState, PokerGameStage
-from shallowstack.subtree.subtree_manager import SubtreeManager
+from shallowstack.subtree.best_response import BestResponse
+from shallowstack.subtree.cfr import CFRParameters
+from shallowstack.subtree.lookahead import Lookahead
+from shallowstack.subtree.parallel import WorkerPool, run_task
+from shallowstack.subtree.profiler import PROFILE, ResolveStats
+from shallowstack.subtree.subtree_manager import CHANCE_WORKERS, SubtreeManager
+
+
+class TreeRepresentation(Enum):
+    OBJECT = "object"
+    LOOKAHEAD = "lookahead"
+
+
+TREE_REPRESENTATION = TreeRepresentation(
+    RESOLVER_CONFIG.get("TREE_REPRESENTATION", "object")
+)
+EXPLOITABILITY_INTERVAL = RESOLVER_CONFIG.getint("EXPLOITABILITY_INTERVAL", 0)
+EXPLOITABILITY_THRESHOLD = RESOLVER_CONFIG.getfloat("EXPLOITABILITY_THRESHOLD", 0.0)
+WARM_START = RESOLVER_CONFIG.getboolean("WARM_START", True)
+ENSEMBLE_SIZE = RESOLVER_CONFIG.getint("ENSEMBLE_SIZE", 1)
+
+
+class ResolveResult(NamedTuple):
+    action: Action
+    r1: np.ndarray
+    r2: np.ndarray
+    # Average strategy at the root, also used as the estimate of the opponent strategy
+    strategy: np.ndarray
+    iterations: int
+    # (iteration, exploitability) for every time the exploitability was measured
+    convergence: List[Tuple[int, float]]
+    # Whether the resolve continued from the tree of the previous one
+    warm_started: bool
+    # Time per phase and work done, empty unless profiled
+    stats: ResolveStats
+
+
+class Solution(NamedTuple):
+    """
+    Outcome of the CFR iterations of a single solve
+    """
+
+    strategy: np.ndarray
+    iterations: int
+    convergence: List[Tuple[int, float]]
+    warm_started: bool
+    stats: ResolveStats
 
 
 class Resolver:
+    def __init__(self):
+        # Kept to warm start the next resolve of the hand
+        self.previous_tree: Optional[SubtreeManager] = None
+
+    def reset(self):
+        """
+        Forgets the previous tree, at the start of a new hand
+        """
+        self.previous_tree = None
+
     def resolve(
         self,
         state: GameState,
@@ -16,33 +75,128 @@ class Resolver:
         end_depth: int,
         nbr_rollouts: int,
         show_internal_values: bool = False,
-    ) -> Tuple[Action, np.ndarray, np.ndarray, np.ndarray]:
+        tree_representation: TreeRepresentation = TREE_REPRESENTATION,
+        cfr: Optional[CFRParameters] = None,
+        time_budget: Optional[float] = None,
+        exploitability_interval: int = EXPLOITABILITY_INTERVAL,
+        exploitability_threshold: float = EXPLOITABILITY_THRESHOLD,
+        warm_start: bool = WARM_START,
+        ensemble_size: int = ENSEMBLE_SIZE,
+        should_stop: Optional[Callable[[], bool]] = None,
+        profile: bool = PROFILE,
+        seed: Optional[int] = None,
+    ) -> ResolveResult:
         """
         Runs the Re-Solve algorithm to generate an optimal action, and new ranges
 
-        returns tuple:
+        The tree is either walked node by node as SubtreeNode objects, or
+        solved level by level as a Lookahead, depending on tree_representation.
+        cfr selects the CFR variant, and defaults to the one in the config
+
+        With a time_budget in seconds, iterations are run until the next one is
+        expected to end past the budget, with nbr_rollouts as an upper limit.
+        At least one iteration is always run
+
+        With an exploitability_interval, the exploitability of the average
+        strategies is measured every that many iterations, and the resolve stops
+        early once it is below exploitability_threshold
+
+        With warm_start, the resolve continues from the node for the same
+        state in the tree of the previous resolve, when there is one,
+        with its regrets and strategies instead of uniform ones
+
+        With an ensemble_size above 1, that many independent solves with their
+        own random deals and action orders run at the same time, one here and
+        the others in worker processes, and their average strategies are
+        averaged, weighted by their number of iterations. Only the solve run
+        here is warm started, and kept for the next resolve
+
+        should_stop is called after every iteration, and the resolve stops
+        early when it returns True, e.g. when it is cancelled. It has to be
+        picklable when there is an ensemble
+
+        With profile, the time spent in each phase of the resolve and counters
+        of the work done are recorded in the stats of the result, and printed
+        with the internal values. The stats of an ensemble add up its solves
+
+        With a seed, the deals, the actions visited and the action taken are
+        drawn from generators seeded by it, so resolves of the same state do
+        the same work and return the same result. Stopping on a time budget
+        or should_stop still depends on timing
+
+        returns ResolveResult:
             action: Action
             r1: np.ndarray
             r2: np.ndarray
             strategy of new state: np.ndarray
-
+            iterations: the number of iterations run, by all solves
+            convergence: the measured exploitability by iteration
         """
-        strategy = np.ones((r1.size, len(AGENT_ACTIONS)))
-        strategy /= strategy.sum(axis=1, keepdims=True)
-        tree = SubtreeManager(state, end_stage, end_depth, strategy)
-
-        r1 = r1.copy()
-        r2 = r2.copy()
+        settings = (
+            state,
+            r1,
+            r2,
+            end_stage,
+            end_depth,
+            nbr_rollouts,
+            tree_representation,
+            cfr,
+            time_budget,
+            exploitability_interval,
+            exploitability_threshold,
+            should_stop,
+            profile,
+        )
+        # Independent streams for sampling the action, and for every solve
+        sample_seed, *seeds = np.random.SeedSequence(seed).spawn(
+            1 + max(ensemble_size, 1)
+        )
+        rng = np.random.default_rng(sample_seed) if seed is not None else np.random
 
-        strategies = np.zeros((nbr_rollouts, r1.size, len(AGENT_ACTIONS)))
-        for t in range(nbr_rollouts):
-            tree.subtree_traversal_rollout(tree.root, r1, r2)
-            strategies[t] = tree.update_strategy_at_node(tree.root)
+        if ensemble_size > 1:
+            pool = WorkerPool.instance("ensemble", ensemble_size - 1)
+            # A fresh resolver has no previous tree to send to the workers,
+            # and their solves can not start chance workers of their own
+            members = pool.map_async(
+                run_task,
+                [
+                    (Resolver(), "solve", *settings, False, np.random.default_rng(s), 0)
+                    for s in seeds[1:]
+                ],
+            )
+            solution = self.solve(
+                *settings, warm_start, np.random.default_rng(seeds[0])
+            )
+            solutions = [solution] + members.get()
+            mean_strategy = np.average(
+                [s.strategy for s in solutions],
+                axis=0,
+                weights=[s.iterations for s in solutions],
+            )
+            iterations = sum(s.iterations for s in solutions)
+            stats = ResolveStats(profile)
+            for s in solutions:
+                stats.merge(s.stats)
+        else:
+            solution = self.solve(
+                *settings,
+                warm_start,
+                np.random.default_rng(seeds[0]) if seed is not None else None,
+            )
+            mean_strategy = solution.strategy
+            iterations = solution.iterations
+            stats = solution.stats
 
         if show_internal_values:
-            print(tree.root)
-
-        mean_strategy = strategies.mean(axis=0)
+            print(self.previous_tree.root)
+            for t, exploitability in solution.convergence:
+                print(f"Exploitability after {t} iterations: {exploitability:.4f}")
+            if ensemble_size > 1:
+                print(
+                    f"Iterations by ensemble member: {[s.iterations for s in solutions]}"
+                )
+            if profile:
+                print(stats)
 
         action_probs = r1 @ mean_strategy
         action_probs /= np.sum(action_probs)
@@ -50,15 +204,135 @@ class Resolver:
         if show_internal_values:
             print(action_probs)
 
-        action_index = np.random.choice(len(AGENT_ACTIONS), p=action_probs)
+        action_index = rng.choice(len(AGENT_ACTIONS), p=action_probs)
 
         r1 = SubtreeManager.bayesian_range_update(r1, mean_strategy, action_index)
+        r2 = r2.copy()
 
         action = AGENT_ACTIONS[action_index]
         # oponent_strategy = self.oponent_strategy_estimate_resulting_state(tree, action)
         oponent_strategy = mean_strategy
 
-        return (action, r1, r2, oponent_strategy)
+        return ResolveResult(
+            action,
+            r1,
+            r2,
+            oponent_strategy,
+            iterations,
+            solution.convergence,
+            solution.warm_started,
+            stats,
+        )
+
+    def solve(
+        self,
+        state: GameState,
+        r1: np.ndarray,
+        r2: np.ndarray,
+        end_stage: PokerGameStage,
+        end_depth: int,
+        nbr_rollouts: int,
+        tree_representation: TreeRepresentation,
+        cfr: Optional[CFRParameters],
+        time_budget: Optional[float],
+        exploitability_interval: int,
+        exploitability_threshold: float,
+        should_stop: Optional[Callable[[], bool]],
+        profile: bool,
+        warm_start: bool,
+        rng: Optional[np.random.Generator] = None,
+        chance_workers: int = CHANCE_WORKERS,
+    ) -> Solution:
+        """
+        Runs the CFR iterations of a resolve, see resolve for the arguments.
+        The tree is kept as the previous tree, to warm start the next resolve
+        """
+        start = time.perf_counter()
+        stats = ResolveStats(profile)
+        strategy = np.ones((r1.size, len(AGENT_ACTIONS)))
+        strategy /= strategy.sum(axis=1, keepdims=True)
+        if cfr is None:
+            cfr = CFRParameters()
+        subtree = SubtreeManager(
+            state,
+            end_stage,
+            end_depth,
+            strategy,
+            cfr=cfr,
+            rng=rng,
+            chance_workers=chance_workers,
+            stats=stats,
+        )
+        lookahead = tree_representation == TreeRepresentation.LOOKAHEAD
+
+        warm_started = False
+        if warm_start and self.previous_tree is not None:
+            previous = SubtreeManager.find_node(self.previous_tree.root, state)
+            if previous is not None:
+                # The lookahead is built from the whole tree, so all of it is seeded
+                with stats.phase("warm start"):
+                    subtree.warm_start(
+                        previous,
+                        self.previous_tree.iteration,
+                        deep=True if lookahead else None,
+                    )
+                warm_started = True
+
+        tree = subtree
+        if lookahead:
+            with stats.phase("lookahead build"):
+                tree = Lookahead(subtree)
+
+        r1 = r1.copy()
+        r2 = r2.copy()
+
+        # The trees average their strategies as they go, weighted by cfr
+        loop_start = time.perf_counter()
+        iterations = 0
+        convergence: List[Tuple[int, float]] = []
+        while iterations < nbr_rollouts:
+            tree.run_iteration(r1, r2)
+            iterations += 1
+
+            if (
+                exploitability_interval > 0
+                and iterations % exploitability_interval == 0
+            ):
+                with stats.phase("exploitability"):
+                    exploitability = Resolver.exploitability(tree, r1, r2)
+                convergence.append((iterations, exploitability))
+                if exploitability < exploitability_threshold:
+                    break
+
+            if time_budget is not None:
+                now = time.perf_counter()
+                iteration_time = (now - loop_start) / iterations
+                if now - start + iteration_time > time_budget:
+                    break
+
+            if should_stop is not None and should_stop():
+                break
+
+        mean_strategy = tree.average_strategy()
+
+        if isinstance(tree, Lookahead):
+            tree.store_strategies()
+        self.previous_tree = subtree
+        subtree.release_workers()
+
+        return Solution(mean_strategy, iterations, convergence, warm_started, stats)
+
+    @staticmethod
+    def exploitability(
+        tree: Union[SubtreeManager, Lookahead], r1: np.ndarray, r2: np.ndarray
+    ) -> float:
+        """
+        Exploitability of the average strategies of the tree, for the root ranges
+        """
+        if isinstance(tree, Lookahead):
+            tree.store_strategies()
+            tree = tree.tree
+        return BestResponse.exploitability(tree, r1, r2)
 
     def oponent_strategy_estimate_resulting_state(
         self, tree: SubtreeManager, action: Action
@@ -0,0 +1 @@
+from shallowstack.service.app import create_app
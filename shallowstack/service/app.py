@@ -0,0 +1,123 @@
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException
+import numpy as np
+from pydantic import BaseModel
+
+from shallowstack.config.config import SERVICE_CONFIG
+from shallowstack.neural_net.batching_network import BatchingNetwork
+from shallowstack.neural_net.neural_net_manager import NNManager
+from shallowstack.poker.card import Card, Deck
+from shallowstack.resolver.resolver import Resolver
+from shallowstack.state_manager.state_manager import GameState, PokerGameStage
+
+# Seconds an evaluation waits for evaluations from other requests to batch with
+BATCH_WINDOW = SERVICE_CONFIG.getfloat("BATCH_WINDOW", 0.002)
+MAX_BATCH_SIZE = SERVICE_CONFIG.getint("MAX_BATCH_SIZE", 256)
+
+
+class StateModel(BaseModel):
+    """
+    A game state where a player is to act, with the public cards as card ids
+    """
+
+    stage: str
+    current_player_index: int
+    player_bets: List[float]
+    player_chips: List[float]
+    player_checks: List[float]
+    players_in_game: List[float]
+    players_all_in: List[bool]
+    pot: float
+    bet_to_match: float
+    public_cards: List[int]
+    stage_bet_count: int = 0
+
+    def to_state(self) -> GameState:
+        public_info = [Card.from_id(id) for id in self.public_cards]
+        deck = Deck()
+        deck.remove_cards(public_info)
+        return GameState(
+            PokerGameStage[self.stage],
+            self.current_player_index,
+            np.array(self.player_bets),
+            np.array(self.player_chips),
+            np.array(self.player_checks),
+            np.array(self.players_in_game),
+            np.array(self.players_all_in),
+            self.pot,
+            self.bet_to_match,
+            public_info,
+            deck,
+            stage_bet_count=self.stage_bet_count,
+        )
+
+
+class ResolveRequest(BaseModel):
+    state: StateModel
+    r1: List[float]
+    r2: List[float]
+    end_stage: str
+    end_depth: int
+    nbr_rollouts: int
+    time_budget: Optional[float] = None
+    # Makes the resolve deterministic, when there is no time budget
+    seed: Optional[int] = None
+
+
+class ResolveResponse(BaseModel):
+    action_type: str
+    amount: int
+    r1: List[float]
+    r2: List[float]
+    iterations: int
+
+
+def create_app(
+    batch_window: float = BATCH_WINDOW, max_batch_size: int = MAX_BATCH_SIZE
+) -> FastAPI:
+    """
+    Creates the resolve service
+
+    The networks and lookup tables stay loaded for the life of the service.
+    Requests are resolved in the threads of the server, and the terminal
+    node evaluations of concurrent requests are batched together
+    """
+    app = FastAPI(title="shallowstack")
+
+    def batching(network):
+        if isinstance(network, BatchingNetwork):
+            return network
+        return BatchingNetwork(network, batch_window, max_batch_size)
+
+    @app.on_event("startup")
+    def load_networks():
+        NNManager.instance().wrap_networks(batching)
+
+    @app.post("/resolve", response_model=ResolveResponse)
+    def resolve(request: ResolveRequest) -> ResolveResponse:
+        try:
+            state = request.state.to_state()
+            end_stage = PokerGameStage[request.end_stage]
+        except (KeyError, ValueError) as error:
+            raise HTTPException(status_code=422, detail=f"Invalid state: {error}")
+
+        result = Resolver().resolve(
+            state,
+            np.array(request.r1),
+            np.array(request.r2),
+            end_stage,
+            request.end_depth,
+            request.nbr_rollouts,
+            time_budget=request.time_budget,
+            seed=request.seed,
+        )
+        return ResolveResponse(
+            action_type=result.action.action_type.name,
+            amount=result.action.amount,
+            r1=result.r1.tolist(),
+            r2=result.r2.tolist(),
+            iterations=result.iterations,
+        )
+
+    return app
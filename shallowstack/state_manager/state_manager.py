@@ -1,6 +1,6 @@
 import copy
 from enum import Enum
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from shallowstack.config.config import POKER_CONFIG
 from shallowstack.game.action import ALLOWED_RAISES, Action, ActionType
 from shallowstack.poker.card import Card, Deck
@@ -86,18 +86,27 @@ class GameState:
 class StateManager:
     @staticmethod
     def get_child_states(
-        state: GameState, nbr_random_events: int
+        state: GameState,
+        nbr_random_events: int,
+        rng: Optional[np.random.Generator] = None,
+        seed: Optional[int] = None,
     ) -> List[Tuple[Action, GameState]]:
         """
         Generates child states for a given state
+
+        rng: The generator random deals are drawn with, defaults to the global one
+        seed: Seeds a new generator for the deals, when no rng is given
         """
+        if rng is None and seed is not None:
+            rng = np.random.default_rng(seed)
+
         states = []
         if state.game_state_type == PokerGameStateType.PLAYER:
             states = StateManager.get_actions_with_new_states(state)
         elif state.game_state_type == PokerGameStateType.DEALER:
             for _ in range(nbr_random_events):
                 new_state = state.copy()
-                deck = Deck()
+                deck = Deck(rng=rng)
                 deck.remove_cards(new_state.public_info)
                 states.append((None, StateManager.progress_stage(new_state, deck)))
 
@@ -0,0 +1,163 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from shallowstack.game.action import agent_action_index
+from shallowstack.state_manager import PokerGameStage
+from shallowstack.subtree.subtree_manager import (
+    AVG_POT_SIZE,
+    NodeType,
+    SubtreeManager,
+    SubtreeNode,
+)
+
+
+class BestResponse:
+    """
+    Measures how far the average strategies of a subtree are from an equilibrium
+
+    Both players are played against a best response to their average strategy,
+    over the children generated so far, with the terminal nodes valued by the
+    networks. Exploitability is the mean of the two best response values,
+    and goes to 0 as the strategies converge.
+
+    As the networks do not give exactly zero-sum values, it is an estimate
+    """
+
+    @staticmethod
+    def exploitability(tree: SubtreeManager, r1: np.ndarray, r2: np.ndarray) -> float:
+        ranges: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        terminal_nodes: List[SubtreeNode] = []
+        BestResponse.propagate_ranges(tree, tree.root, r1, r2, ranges, terminal_nodes)
+
+        # Every terminal node is evaluated once, for both best responses
+        terminal_values: Dict[int, np.ndarray] = {}
+        stages: Dict[PokerGameStage, List[SubtreeNode]] = {}
+        for node in terminal_nodes:
+            stages.setdefault(node.state.stage, []).append(node)
+        for stage, nodes in stages.items():
+            v1, v2 = tree.network_values(
+                stage,
+                nodes,
+                [ranges[id(node)][0] for node in nodes],
+                [ranges[id(node)][1] for node in nodes],
+            )
+            for i, node in enumerate(nodes):
+                terminal_values[id(node)] = np.array([v1[i], v2[i]])
+
+        br1 = BestResponse.values(tree, tree.root, 0, ranges, terminal_values)
+        br2 = BestResponse.values(tree, tree.root, 1, ranges, terminal_values)
+        return float((r1 @ br1 + r2 @ br2) / 2)
+
+    @staticmethod
+    def average_strategy(node: SubtreeNode) -> np.ndarray:
+        if node.average_strategy.value is None:
+            return node.strategy
+        return node.average_strategy.value
+
+    @staticmethod
+    def propagate_ranges(
+        tree: SubtreeManager,
+        node: SubtreeNode,
+        r1: np.ndarray,
+        r2: np.ndarray,
+        ranges: Dict[int, Tuple[np.ndarray, np.ndarray]],
+        terminal_nodes: List[SubtreeNode],
+    ):
+        """
+        Passes the ranges down the tree with both players
+        following their average strategies
+        """
+        ranges[id(node)] = (r1, r2)
+        match node.node_type:
+            case NodeType.TERMINAL:
+                terminal_nodes.append(node)
+
+            case NodeType.PLAYER:
+                player_index = (
+                    node.state.current_player_index + tree.root_player_index
+                ) % 2
+                strategy = BestResponse.average_strategy(node)
+                for action, child in node.children:
+                    a = agent_action_index(action)
+                    action_ranges = [r1, r2]
+                    action_ranges[player_index] = SubtreeManager.bayesian_range_update(
+                        action_ranges[player_index], strategy, a
+                    )
+                    BestResponse.propagate_ranges(
+                        tree, child, *action_ranges, ranges, terminal_nodes
+                    )
+
+            case NodeType.CHANCE:
+                r1_e = SubtreeManager.update_range_from_public_cards(
+                    r1, node.state.public_info
+                )
+                r2_e = SubtreeManager.update_range_from_public_cards(
+                    r2, node.state.public_info
+                )
+                for _, child in node.children:
+                    BestResponse.propagate_ranges(
+                        tree, child, r1_e, r2_e, ranges, terminal_nodes
+                    )
+
+    @staticmethod
+    def values(
+        tree: SubtreeManager,
+        node: SubtreeNode,
+        player: int,
+        ranges: Dict[int, Tuple[np.ndarray, np.ndarray]],
+        terminal_values: Dict[int, np.ndarray],
+    ) -> np.ndarray:
+        """
+        Values of every hand of the player, when best responding
+        to the average strategy of the other player
+        """
+        r1, r2 = ranges[id(node)]
+        if node.node_type in [NodeType.PLAYER, NodeType.CHANCE] and not node.children:
+            # Not expanded yet, so only its value from the last rollout is known
+            return node.values[player]
+
+        match node.node_type:
+            case NodeType.SHOWDOWN:
+                scale = node.state.pot / AVG_POT_SIZE
+                if player == 0:
+                    return node.utility_matrix @ r2.T * scale
+                return -r1 @ node.utility_matrix * scale
+
+            case NodeType.WON:
+                won = node.state.winner_index == tree.root_player_index
+                sign = 1 if won == (player == 0) else -1
+                return sign * np.ones_like(r1) * node.state.pot / AVG_POT_SIZE
+
+            case NodeType.TERMINAL:
+                return terminal_values[id(node)][player]
+
+            case NodeType.CHANCE:
+                child_values = [
+                    BestResponse.values(tree, child, player, ranges, terminal_values)
+                    for _, child in node.children
+                ]
+                return np.mean(child_values, axis=0)
+
+            case NodeType.PLAYER:
+                child_values = [
+                    BestResponse.values(tree, child, player, ranges, terminal_values)
+                    for _, child in node.children
+                ]
+                player_index = (
+                    node.state.current_player_index + tree.root_player_index
+                ) % 2
+                if player_index == player:
+                    return np.max(child_values, axis=0)
+
+                # The ranges of the children were divided by the probability
+                # of their action, so it is undone when summing them up
+                strategy = BestResponse.average_strategy(node)
+                v = np.zeros_like(r1)
+                for (action, _), child_value in zip(node.children, child_values):
+                    a = agent_action_index(action)
+                    p_action = SubtreeManager.action_probability(strategy, a)
+                    v += p_action * child_value
+                return v
+
+        return np.zeros_like(r1)
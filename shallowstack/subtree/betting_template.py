@@ -0,0 +1,103 @@
+import copy
+from collections import OrderedDict
+from typing import List, Tuple
+
+from shallowstack.config.config import RESOLVER_CONFIG
+from shallowstack.game.action import Action
+from shallowstack.state_manager.state_manager import (
+    BET_PER_STAGE_LIMIT,
+    GameState,
+    PokerGameStateType,
+    StateManager,
+)
+
+TEMPLATE_CACHE_SIZE = RESOLVER_CONFIG.getint("TEMPLATE_CACHE_SIZE", 20000)
+
+
+def betting_key(state: GameState) -> Tuple:
+    """
+    Key describing the public betting situation of a state
+
+    Everything that decides which actions are legal, and what they lead to,
+    is included. Public cards and the deck are not, as betting never
+    depends on them
+    """
+    return (
+        state.stage,
+        state.game_state_type,
+        state.current_player_index,
+        tuple(state.player_bets.tolist()),
+        tuple(state.player_chips.tolist()),
+        tuple(state.player_checks.tolist()),
+        tuple(state.players_in_game.tolist()),
+        tuple(state.players_all_in.tolist()),
+        state.pot,
+        state.bet_to_match,
+        state.stage_bet_count,
+        BET_PER_STAGE_LIMIT,
+    )
+
+
+class BettingTemplate:
+    """
+    The betting tree below a public betting situation, up until the next
+    chance node (or a winner)
+
+    Templates are built once per betting situation and cached, so building
+    a resolve tree is reduced to a lookup and instantiating the states with
+    the public cards of the resolve. The cache keeps the TEMPLATE_CACHE_SIZE
+    most recently used betting situations, as stacks and pots vary a lot
+    over a long session
+    """
+
+    _cache: "OrderedDict[Tuple, BettingTemplate]" = OrderedDict()
+
+    def __init__(self, state: GameState):
+        self.state = state
+        self.children: List[Tuple[Action, BettingTemplate]] = []
+
+        if state.game_state_type == PokerGameStateType.PLAYER:
+            for action, child_state in StateManager.get_actions_with_new_states(state):
+                self.children.append((action, BettingTemplate.for_state(child_state)))
+
+    def instantiate(self, parent: GameState) -> GameState:
+        """
+        Creates a state for this betting situation with the public cards
+        and deck of the given parent state
+        """
+        s = copy.copy(self.state)
+        # The arrays are copied so the template is never changed through a state
+        s.player_bets = self.state.player_bets.copy()
+        s.player_chips = self.state.player_chips.copy()
+        s.player_checks = self.state.player_checks.copy()
+        s.players_in_game = self.state.players_in_game.copy()
+        s.players_all_in = self.state.players_all_in.copy()
+        s.public_info = parent.public_info
+        s.deck = parent.deck
+        return s
+
+    @staticmethod
+    def for_state(state: GameState) -> "BettingTemplate":
+        """
+        Returns the cached template for the betting situation of the given state,
+        building it if this is the first time it is seen
+        """
+        key = betting_key(state)
+        template = BettingTemplate._cache.get(key)
+        if template is not None:
+            BettingTemplate._cache.move_to_end(key)
+        else:
+            # Strip the cards so the states kept in the cache are cheap to copy
+            public_state = copy.copy(state)
+            public_state.public_info = []
+            public_state.deck = None
+            template = BettingTemplate(public_state.copy())
+            BettingTemplate._cache[key] = template
+            while len(BettingTemplate._cache) > TEMPLATE_CACHE_SIZE:
+                BettingTemplate._cache.popitem(last=False)
+
+        return template
+
+    @staticmethod
+    def clear_cache():
+        BettingTemplate._cache.clear()
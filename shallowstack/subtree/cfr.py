@@ -0,0 +1,103 @@
+from enum import Enum
+from typing import Optional
+
+import numpy as np
+
+from shallowstack.config.config import RESOLVER_CONFIG
+
+
+class CFRVariant(Enum):
+    VANILLA = "vanilla"
+    CFR_PLUS = "cfr+"
+    LINEAR = "linear"
+    DISCOUNTED = "discounted"
+
+
+CFR_VARIANT = CFRVariant(RESOLVER_CONFIG.get("CFR_VARIANT", "vanilla"))
+DCFR_ALPHA = RESOLVER_CONFIG.getfloat("DCFR_ALPHA", 1.5)
+DCFR_BETA = RESOLVER_CONFIG.getfloat("DCFR_BETA", 0.0)
+DCFR_GAMMA = RESOLVER_CONFIG.getfloat("DCFR_GAMMA", 2.0)
+ALTERNATING_UPDATES = RESOLVER_CONFIG.getboolean("ALTERNATING_UPDATES", False)
+
+
+class CFRParameters:
+    """
+    Describes how regrets are accumulated and strategies averaged
+
+    Iterations are counted from 1. Linear CFR is discounted CFR with
+    alpha = beta = gamma = 1, and CFR+ uses linear averaging
+    """
+
+    def __init__(
+        self,
+        variant: CFRVariant = CFR_VARIANT,
+        alpha: float = DCFR_ALPHA,
+        beta: float = DCFR_BETA,
+        gamma: float = DCFR_GAMMA,
+        alternating: bool = ALTERNATING_UPDATES,
+    ):
+        self.variant = variant
+        self.alternating = alternating
+
+        if variant == CFRVariant.LINEAR:
+            alpha, beta, gamma = 1.0, 1.0, 1.0
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+
+    def update_regrets(
+        self, regrets: np.ndarray, instant_regrets: np.ndarray, t: int
+    ) -> np.ndarray:
+        """
+        Adds the regrets of iteration t to the cumulative regrets
+        """
+        if self.variant == CFRVariant.CFR_PLUS:
+            return np.maximum(regrets + instant_regrets, 0)
+
+        if self.variant in [CFRVariant.LINEAR, CFRVariant.DISCOUNTED] and t > 1:
+            # Discount everything accumulated up until the last iteration
+            s = t - 1
+            positive = s**self.alpha / (s**self.alpha + 1)
+            negative = s**self.beta / (s**self.beta + 1)
+            regrets = regrets * np.where(regrets > 0, positive, negative)
+
+        return regrets + instant_regrets
+
+    def strategy_weight(self, t: int) -> float:
+        """
+        Weight of the strategy from iteration t in the average strategy
+        """
+        if self.variant == CFRVariant.VANILLA:
+            return 1.0
+        if self.variant == CFRVariant.CFR_PLUS:
+            return float(t)
+        return float(t) ** self.gamma
+
+    def updates_player(self, player_index: int, t: int) -> bool:
+        """
+        Whether the player (0 being the resolving player) has its regrets
+        updated in iteration t
+        """
+        if not self.alternating or t < 1:
+            return True
+        return player_index == (t - 1) % 2
+
+
+class RunningAverage:
+    """
+    Weighted average of a stream of strategies, updated in place
+
+    Only the current average and the total weight are kept,
+    so the memory used does not grow with the number of iterations
+    """
+
+    def __init__(self):
+        self.value: Optional[np.ndarray] = None
+        self.total_weight = 0.0
+
+    def add(self, x: np.ndarray, weight: float = 1.0):
+        self.total_weight += weight
+        if self.value is None:
+            self.value = np.array(x, dtype=float)
+        elif self.total_weight > 0:
+            self.value += (weight / self.total_weight) * (x - self.value)
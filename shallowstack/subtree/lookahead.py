@@ -0,0 +1,370 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from shallowstack.game.action import agent_action_index
+from shallowstack.neural_net.util import InputEncoder
+from shallowstack.state_manager import PokerGameStage
+from shallowstack.subtree.cfr import RunningAverage
+from shallowstack.subtree.subtree_manager import (
+    AVG_POT_SIZE,
+    NodeType,
+    SubtreeManager,
+    SubtreeNode,
+)
+
+
+class LookaheadLevel:
+    """
+    All nodes at one depth of the lookahead tree
+
+    Ranges and values are stored as (nodes, players, hands),
+    strategies and regrets of the player nodes as (player nodes, hands, actions).
+
+    The children of a node are stored contiguously in the next level,
+    in the same order as their parents
+    """
+
+    def __init__(
+        self,
+        nodes: List[SubtreeNode],
+        parents: np.ndarray,
+        actions: np.ndarray,
+        root_player_index: int,
+    ):
+        self.nodes = nodes
+        self.size = len(nodes)
+        self.parents = parents
+        self.actions = actions
+
+        range_size = nodes[0].values.shape[1]
+        self.ranges = np.zeros((self.size, 2, range_size))
+        self.values = np.zeros((self.size, 2, range_size))
+
+        self.child_start = np.zeros(self.size, dtype=int)
+        self.child_count = np.zeros(self.size, dtype=int)
+
+        # Player nodes
+        self.player = np.array(
+            [i for i, n in enumerate(nodes) if n.node_type == NodeType.PLAYER],
+            dtype=int,
+        )
+        self.player_pos = -np.ones(self.size, dtype=int)
+        self.player_pos[self.player] = np.arange(len(self.player))
+        self.acting = np.array(
+            [
+                (nodes[i].state.current_player_index + root_player_index) % 2
+                for i in self.player
+            ],
+            dtype=int,
+        )
+        self.strategy = np.array([nodes[i].strategy for i in self.player])
+        self.regrets = np.array([nodes[i].regrets for i in self.player])
+        self.average_strategy = RunningAverage()
+
+        self.chance = np.array(
+            [i for i, n in enumerate(nodes) if n.node_type == NodeType.CHANCE],
+            dtype=int,
+        )
+
+        # Leaves
+        self.showdown_groups: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        showdown: Dict[int, List[int]] = {}
+        for i, n in enumerate(nodes):
+            if n.node_type == NodeType.SHOWDOWN:
+                showdown.setdefault(id(n.utility_matrix), []).append(i)
+        for indices in showdown.values():
+            self.showdown_groups.append(
+                (
+                    np.array(indices, dtype=int),
+                    nodes[indices[0]].utility_matrix,
+                    np.array([nodes[i].state.pot / AVG_POT_SIZE for i in indices]),
+                )
+            )
+
+        self.won = np.array(
+            [i for i, n in enumerate(nodes) if n.node_type == NodeType.WON], dtype=int
+        )
+        self.won_values = np.array(
+            [
+                (1 if nodes[i].state.winner_index == root_player_index else -1)
+                * nodes[i].state.pot
+                / AVG_POT_SIZE
+                for i in self.won
+            ]
+        )
+
+        self.terminal_groups: List[Tuple[PokerGameStage, np.ndarray, np.ndarray]] = []
+        terminal: Dict[PokerGameStage, List[int]] = {}
+        for i, n in enumerate(nodes):
+            if n.node_type == NodeType.TERMINAL:
+                terminal.setdefault(n.state.stage, []).append(i)
+        for stage, indices in terminal.items():
+            # The public part of the network input never changes
+            public_input = np.array(
+                [
+                    [card.id for card in nodes[i].state.public_info]
+                    + [nodes[i].state.pot]
+                    for i in indices
+                ],
+                dtype=np.float32,
+            )
+            self.terminal_groups.append(
+                (stage, np.array(indices, dtype=int), public_input)
+            )
+
+
+class Lookahead:
+    """
+    Array backed representation of a subtree, in the style of DeepStack
+
+    Instead of walking the tree one node at a time, every node at a depth is
+    handled at once with a few tensor operations, both when passing ranges
+    down the tree and values up the tree.
+
+    The lookahead is built from the fully expanded tree of a SubtreeManager,
+    and follows the same update rules as its rollouts
+    """
+
+    def __init__(self, tree: SubtreeManager):
+        self.tree = tree
+        self.root = tree.root
+        self.root_player_index = tree.root_player_index
+        self.cfr = tree.cfr
+        # Continues from a warm started tree
+        self.iteration = tree.iteration
+
+        tree.generate_full_tree(tree.root)
+
+        self.levels: List[LookaheadLevel] = []
+
+        nodes = [tree.root]
+        parents = -np.ones(1, dtype=int)
+        actions = -np.ones(1, dtype=int)
+        while len(nodes) > 0:
+            level = LookaheadLevel(nodes, parents, actions, self.root_player_index)
+            self.levels.append(level)
+
+            next_nodes: List[SubtreeNode] = []
+            next_parents: List[int] = []
+            next_actions: List[int] = []
+            for i, node in enumerate(nodes):
+                level.child_start[i] = len(next_nodes)
+                level.child_count[i] = len(node.children)
+                for action, child in node.children:
+                    next_nodes.append(child)
+                    next_parents.append(i)
+                    next_actions.append(
+                        agent_action_index(action) if action is not None else -1
+                    )
+
+            nodes = next_nodes
+            parents = np.array(next_parents, dtype=int)
+            actions = np.array(next_actions, dtype=int)
+
+        # Children dealt by a chance node have the public cards
+        # of the chance node removed from their ranges
+        self.chance_children: List[np.ndarray] = [np.zeros(0, dtype=int)]
+        self.chance_masks: List[np.ndarray] = [np.zeros((0, tree.root.values.shape[1]))]
+        for parent_level, level in zip(self.levels, self.levels[1:]):
+            indices = np.array(
+                [
+                    i
+                    for i, p in enumerate(level.parents)
+                    if parent_level.nodes[p].node_type == NodeType.CHANCE
+                ],
+                dtype=int,
+            )
+            masks = np.zeros((len(indices), level.ranges.shape[2]))
+            for j, i in enumerate(indices):
+                masks[j] = SubtreeManager.update_range_from_public_cards(
+                    np.ones(level.ranges.shape[2]),
+                    parent_level.nodes[level.parents[i]].state.public_info,
+                )
+            self.chance_children.append(indices)
+            self.chance_masks.append(masks)
+
+    def run_iteration(self, r1: np.ndarray, r2: np.ndarray) -> np.ndarray:
+        """
+        Runs a single iteration over the whole lookahead
+
+        Returns the updated strategy at the root
+        """
+        stats = self.tree.stats
+        self.iteration += 1
+        stats.count("iterations")
+        self.levels[0].ranges[0] = [r1, r2]
+        with stats.phase("range updates"):
+            for d in range(1, len(self.levels)):
+                self.propagate_ranges(d)
+
+        for d in reversed(range(len(self.levels))):
+            with stats.phase("terminal values"):
+                self.evaluate_leaves(self.levels[d])
+            if d + 1 < len(self.levels):
+                with stats.phase("values"):
+                    self.propagate_values(d)
+
+        with stats.phase("regrets"):
+            for d in range(len(self.levels) - 1):
+                self.update_strategies(d)
+
+        return self.levels[0].strategy[0]
+
+    def average_strategy(self) -> np.ndarray:
+        """
+        Returns the average strategy at the root over the iterations run so far
+        """
+        return self.levels[0].average_strategy.value[0]
+
+    def store_strategies(self):
+        """
+        Copies the strategies, regrets and average strategies of the player nodes
+        back into the SubtreeNode objects the lookahead was built from
+        """
+        for level in self.levels:
+            for j, i in enumerate(level.player):
+                node = level.nodes[i]
+                node.strategy = level.strategy[j].copy()
+                node.regrets = level.regrets[j].copy()
+                if level.average_strategy.value is not None:
+                    node.average_strategy.value = level.average_strategy.value[j].copy()
+                    node.average_strategy.total_weight = (
+                        level.average_strategy.total_weight
+                    )
+
+    def propagate_ranges(self, d: int):
+        """
+        Computes the ranges at depth d from the ranges at depth d - 1
+        """
+        parent_level = self.levels[d - 1]
+        level = self.levels[d]
+
+        ranges = parent_level.ranges[level.parents]
+
+        player_children, pos, actions = self.player_children(d)
+        if len(player_children) > 0:
+            acting = parent_level.acting[pos]
+            strategy = parent_level.strategy
+            s_a = strategy[pos, :, actions]
+            p_action = s_a.sum(axis=1) / strategy[pos].sum(axis=(1, 2)) + 0.001
+            ranges[player_children, acting] *= s_a / p_action[:, None]
+
+        chance_children = self.chance_children[d]
+        if len(chance_children) > 0:
+            ranges[chance_children] *= self.chance_masks[d][:, None, :]
+
+        level.ranges = ranges
+
+    def evaluate_leaves(self, level: LookaheadLevel):
+        """
+        Sets the values of all the showdown, won and terminal nodes at a depth
+        """
+        for indices, utility_matrix, scale in level.showdown_groups:
+            r1 = level.ranges[indices, 0]
+            r2 = level.ranges[indices, 1]
+            level.values[indices, 0] = (r2 @ utility_matrix.T) * scale[:, None]
+            level.values[indices, 1] = -(r1 @ utility_matrix) * scale[:, None]
+
+        if len(level.won) > 0:
+            level.values[level.won, 0] = level.won_values[:, None]
+            level.values[level.won, 1] = -level.won_values[:, None]
+
+        for stage, indices, public_input in level.terminal_groups:
+            with self.tree.stats.phase("network loading"):
+                network = self.tree.nn_manager.get_network(stage)
+            encoder = InputEncoder.for_size(public_input.shape[1] - 1)
+            x = encoder.encode_public(
+                level.ranges[indices, 0], level.ranges[indices, 1], public_input
+            )
+            self.tree.stats.count("network calls")
+            self.tree.stats.count("network inputs", len(indices))
+            with self.tree.stats.phase("network"):
+                v1, v2 = network.predict_values_batch(x)
+            level.values[indices, 0] = v1
+            level.values[indices, 1] = v2
+
+    def propagate_values(self, d: int):
+        """
+        Computes the values of the inner nodes at depth d from their children
+        """
+        level = self.levels[d]
+        child_level = self.levels[d + 1]
+
+        contributions = child_level.values.copy()
+        player_children, pos, actions = self.player_children(d + 1)
+        if len(player_children) > 0:
+            # Strategy weighted for the acting player,
+            # action probability weighted for the other one
+            strategy = level.strategy
+            s_a = strategy[pos, :, actions]
+            p_action = s_a.sum(axis=1) / strategy[pos].sum(axis=(1, 2)) + 0.001
+            weights = np.empty(contributions[player_children].shape)
+            weights[:] = p_action[:, None, None]
+            weights[np.arange(len(player_children)), level.acting[pos]] = s_a
+            contributions[player_children] *= weights
+
+        inner = np.nonzero(level.child_count)[0]
+        level.values[inner] = np.add.reduceat(
+            contributions, level.child_start[inner], axis=0
+        )
+        if len(level.chance) > 0:
+            level.values[level.chance] /= level.child_count[level.chance][:, None, None]
+
+    def update_strategies(self, d: int):
+        """
+        Updates the regrets and does regret matching for every player node at depth d,
+        and adds the new strategies to their averages
+        """
+        level = self.levels[d]
+        if len(level.player) == 0:
+            return
+
+        self.update_regrets(d)
+        level.average_strategy.add(
+            level.strategy, self.cfr.strategy_weight(self.iteration)
+        )
+
+    def update_regrets(self, d: int):
+        level = self.levels[d]
+        t = self.iteration
+        player_children, pos, actions = self.player_children(d + 1)
+        acting = level.acting[pos]
+        child_values = self.levels[d + 1].values[player_children, acting]
+        node_values = level.values[level.player[pos], acting]
+        instant_regrets = np.zeros_like(level.regrets)
+        instant_regrets[pos, :, actions] = child_values - node_values
+
+        updated = np.array(
+            [self.cfr.updates_player(p, t) for p in level.acting], dtype=bool
+        )
+        if not np.any(updated):
+            return
+        level.regrets[updated] = self.cfr.update_regrets(
+            level.regrets[updated], instant_regrets[updated], t
+        )
+
+        R_plus = np.clip(level.regrets, 0, None)
+        divisor = R_plus.sum(axis=2, keepdims=True)
+
+        # Adding this to avoid the division by 0
+        divisor[divisor == 0] = 1 / level.regrets.shape[2]
+
+        strategy = R_plus / divisor
+
+        # Must avoid empty strategies, keeping the previous one instead
+        empty = strategy.sum(axis=(1, 2)) == 0
+        strategy[empty] = level.strategy[empty]
+        strategy[~updated] = level.strategy[~updated]
+
+        level.strategy = strategy
+
+    def player_children(self, d: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the nodes at depth d that are children of a player node,
+        the position of their parent among the player nodes and the action leading to them
+        """
+        level = self.levels[d]
+        pos = self.levels[d - 1].player_pos[level.parents]
+        player_children = np.nonzero(pos >= 0)[0]
+        return player_children, pos[player_children], level.actions[player_children]
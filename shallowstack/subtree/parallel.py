@@ -0,0 +1,248 @@
+import atexit
+from collections import OrderedDict
+import multiprocessing
+from multiprocessing.pool import AsyncResult
+import os
+import random
+import sys
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import uuid
+
+import numpy as np
+
+# Memory-mapped files in /dev/shm never touch the disk
+SHARED_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+# Number of shared arrays a process keeps mapped after it is done with them
+OPENED_LIMIT = 64
+
+
+class SharedArray(np.memmap):
+    """
+    Read only array in shared memory, which is pickled as a reference to
+    its memory instead of a copy of its data. Arrays derived from it,
+    like slices, are pickled as regular arrays
+    """
+
+    shared_path: Optional[str] = None
+
+    def __reduce__(self):
+        if self.shared_path is None:
+            return (np.array, (np.asarray(self),))
+        return (open_shared, (self.shared_path, self.shape, self.dtype.str))
+
+
+_created: Set[str] = set()
+_opened: "OrderedDict[str, SharedArray]" = OrderedDict()
+
+
+def share(array: np.ndarray) -> SharedArray:
+    """
+    Copies the array into shared memory, which stays allocated until it is released
+    """
+    path = f"{SHARED_DIR}/shallowstack-{os.getpid()}-{uuid.uuid4().hex}"
+    shared = SharedArray(path, dtype=array.dtype, mode="w+", shape=array.shape)
+    shared[...] = array
+    shared.flags.writeable = False
+    shared.shared_path = path
+
+    _created.add(path)
+    _opened[path] = shared
+    return shared
+
+
+def open_shared(path: str, shape: tuple, dtype: str) -> SharedArray:
+    """
+    Maps a shared array, reusing the mapping if the process already has one
+    """
+    if path in _opened:
+        _opened.move_to_end(path)
+        return _opened[path]
+
+    shared = SharedArray(path, dtype=np.dtype(dtype), mode="r", shape=shape)
+    shared.shared_path = path
+    _opened[path] = shared
+    if len(_opened) > OPENED_LIMIT:
+        # The memory is unmapped once the last array using it is gone
+        _opened.popitem(last=False)
+    return shared
+
+
+def release(shared: SharedArray):
+    """
+    Frees the shared memory of an array once every process has unmapped it.
+    Arrays that are still mapped keep working
+    """
+    if shared.shared_path in _created:
+        _created.discard(shared.shared_path)
+        os.remove(shared.shared_path)
+    _opened.pop(shared.shared_path, None)
+
+
+@atexit.register
+def _remove_created():
+    for path in list(_created):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def init_worker():
+    """
+    Initializes a forked worker process
+    """
+    # Forked workers would otherwise share the random state of the parent
+    random.seed()
+    np.random.seed()
+    # The parent's torch threads do not survive the fork
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(1)
+    # Only the parent cleans up the memory it shares
+    _created.clear()
+
+
+def fork_context() -> multiprocessing.context.BaseContext:
+    """
+    Forks the workers where possible, so they start out with what the parent
+    has loaded, sharing its memory
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("fork" if "fork" in methods else None)
+
+
+class WorkerPool:
+    """
+    Persistent pool of worker processes, e.g. for traversing the children
+    of chance nodes, or for running the solves of an ensemble
+
+    Workers are forked where possible, so they start out with the networks
+    and evaluation tables already loaded by the parent, sharing their memory.
+    Use WorkerPool.instance to get the pool shared by the process for a use
+    """
+
+    _instances: Dict[str, "WorkerPool"] = {}
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.pool = fork_context().Pool(workers, initializer=init_worker)
+
+    @staticmethod
+    def instance(name: str, workers: int) -> "WorkerPool":
+        """
+        Returns the pool shared by the process for the named use,
+        with the given number of workers
+        """
+        pool = WorkerPool._instances.get(name)
+        if pool is not None and pool.workers != workers:
+            pool.close()
+            pool = None
+        if pool is None:
+            pool = WorkerPool(workers)
+            WorkerPool._instances[name] = pool
+        return pool
+
+    def map(self, fn: Callable[[Any], Any], tasks: List[Any]) -> List[Any]:
+        return self.pool.map(fn, tasks, chunksize=1)
+
+    def map_async(self, fn: Callable[[Any], Any], tasks: List[Any]) -> AsyncResult:
+        """
+        Starts the tasks without waiting for them, get() the result to wait
+        """
+        return self.pool.map_async(fn, tasks, chunksize=1)
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+
+def run_task(task: tuple) -> Any:
+    """
+    Runs a method of a pickled object in a worker: (object, method name, *args)
+    """
+    obj, method, *args = task
+    return getattr(obj, method)(*args)
+
+
+# Objects kept by a worker of a ResidentPool, by their key
+_resident: Dict[str, Any] = {}
+
+
+def _place(key: str, obj: Any):
+    _resident[key] = obj
+
+
+def _call(key: str, method: str, args: tuple) -> Any:
+    return getattr(_resident[key], method)(*args)
+
+
+def _take(key: str) -> Any:
+    return _resident.pop(key)
+
+
+class ResidentPool:
+    """
+    Persistent pool of worker processes that keep objects between tasks,
+    e.g. the subtrees below the dealt children of chance nodes, so only
+    the arguments and results of each call are sent between processes
+
+    Every object is placed with a given worker, and its methods always run there.
+    Objects stay in the workers until they are taken back.
+    Use ResidentPool.instance to get the pool shared by the process for a use
+    """
+
+    _instances: Dict[str, "ResidentPool"] = {}
+
+    def __init__(self, workers: int):
+        context = fork_context()
+        self.workers = workers
+        # A pool per worker, so calls can be sent to the worker with the object
+        self.pools = [context.Pool(1, initializer=init_worker) for _ in range(workers)]
+        # The worker each object is placed with, by its key
+        self.placement: Dict[str, int] = {}
+
+    @staticmethod
+    def instance(name: str, workers: int) -> "ResidentPool":
+        """
+        Returns the pool shared by the process for the named use,
+        with the given number of workers
+        """
+        pool = ResidentPool._instances.get(name)
+        if pool is not None and pool.workers != workers:
+            pool.close()
+            pool = None
+        if pool is None:
+            pool = ResidentPool(workers)
+            ResidentPool._instances[name] = pool
+        return pool
+
+    def place(self, key: str, obj: Any, worker: int):
+        """
+        Sends an object to a worker, to be kept by its key
+        """
+        self.placement[key] = worker
+        self.pools[worker].apply(_place, (key, obj))
+
+    def call(self, calls: List[Tuple[str, str, tuple]]) -> List[Any]:
+        """
+        Runs the calls, (key, method name, args), on the objects in the workers,
+        returning their results in order
+        """
+        results = [
+            self.pools[self.placement[key]].apply_async(_call, (key, method, args))
+            for key, method, args in calls
+        ]
+        return [result.get() for result in results]
+
+    def take(self, keys: List[str]) -> List[Any]:
+        """
+        Removes the objects from the workers, returning them
+        """
+        results = [
+            self.pools[self.placement.pop(key)].apply_async(_take, (key,))
+            for key in keys
+        ]
+        return [result.get() for result in results]
+
+    def close(self):
+        for pool in self.pools:
+            pool.terminate()
+            pool.join()
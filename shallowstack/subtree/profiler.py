@@ -0,0 +1,92 @@
+from collections import defaultdict
+from contextlib import nullcontext
+import time
+from typing import Dict, List, Tuple
+
+from shallowstack.config.config import RESOLVER_CONFIG
+
+PROFILE = RESOLVER_CONFIG.getboolean("PROFILE", False)
+
+# Shared by every disabled phase, so they cost next to nothing
+_DISABLED_PHASE = nullcontext()
+
+
+class ResolveStats:
+    """
+    Time spent in each phase of a resolve, and counters of the work done
+
+    Phases can be nested, and the time of a phase does not include the time
+    of the phases run inside it, so the phase times add up to the time profiled.
+    When disabled, nothing is recorded
+    """
+
+    def __init__(self, enabled: bool = PROFILE):
+        self.enabled = enabled
+        self.times: Dict[str, float] = defaultdict(float)
+        self.counts: Dict[str, int] = defaultdict(int)
+        # The running phases, with the time they were last resumed
+        self.running: List[Tuple[str, float]] = []
+
+    def phase(self, name: str):
+        """
+        Context manager timing a phase
+        """
+        if not self.enabled:
+            return _DISABLED_PHASE
+        return _Phase(self, name)
+
+    def count(self, name: str, n: int = 1):
+        if self.enabled:
+            self.counts[name] += n
+
+    def start(self, name: str):
+        now = time.perf_counter()
+        if self.running:
+            outer, resumed = self.running[-1]
+            self.times[outer] += now - resumed
+        self.running.append((name, now))
+
+    def stop(self):
+        now = time.perf_counter()
+        name, resumed = self.running.pop()
+        self.times[name] += now - resumed
+        if self.running:
+            self.running[-1] = (self.running[-1][0], now)
+
+    def merge(self, other: "ResolveStats"):
+        """
+        Adds the times and counts of another resolve, e.g. of an ensemble member
+        """
+        for name, t in other.times.items():
+            self.times[name] += t
+        for name, n in other.counts.items():
+            self.counts[name] += n
+
+    def __getstate__(self):
+        # Phases running when the stats are sent to a worker stay here
+        state = self.__dict__.copy()
+        state["running"] = []
+        return state
+
+    def __str__(self) -> str:
+        total = sum(self.times.values())
+        lines = ["Phase                    Seconds      %"]
+        for name, t in sorted(self.times.items(), key=lambda item: -item[1]):
+            share = 100 * t / total if total > 0 else 0
+            lines.append(f"{name:<24} {t:>8.4f} {share:>6.1f}")
+        lines.append("Counter                    Count")
+        for name, n in sorted(self.counts.items()):
+            lines.append(f"{name:<24} {n:>8}")
+        return "\n".join(lines)
+
+
+class _Phase:
+    def __init__(self, stats: ResolveStats, name: str):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.stats.start(self.name)
+
+    def __exit__(self, *exc):
+        self.stats.stop()
@@ -1,24 +1,30 @@
+import copy
 from enum import Enum
 import random
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
+import uuid
 
 import numpy as np
 from shallowstack.config.config import POKER_CONFIG, RESOLVER_CONFIG
 
 from shallowstack.game.action import AGENT_ACTIONS, Action, agent_action_index
 from shallowstack.neural_net.neural_net_manager import NNManager
-from shallowstack.neural_net.util import create_input_vector
-from shallowstack.poker.card import (
-    Card,
-    HOLE_PAIR_INDICES,
-    hole_pair_idx_from_ids,
-)
+from shallowstack.neural_net.util import InputEncoder
+from shallowstack.poker.card import Card, hole_pair_idx_from_ids
 from shallowstack.poker.poker_oracle import PokerOracle
 from shallowstack.state_manager import GameState, PokerGameStage
 from shallowstack.state_manager.state_manager import PokerGameStateType, StateManager
+from shallowstack.subtree.betting_template import BettingTemplate, betting_key
+from shallowstack.subtree.cfr import CFRParameters, RunningAverage
+from shallowstack.subtree.parallel import ResidentPool, SharedArray, release, share
+from shallowstack.subtree.profiler import ResolveStats
 
 NBR_EVENTS = RESOLVER_CONFIG.getint("NBR_RANDOM_EVENTS")
+NBR_ACTIONS_IN_ROLLOUT = RESOLVER_CONFIG.getint("NBR_ACTIONS_IN_ROLLOUT")
+PERSISTENT_TREE = RESOLVER_CONFIG.getboolean("PERSISTENT_TREE", False)
+SAMPLE_ACTIONS = RESOLVER_CONFIG.getboolean("SAMPLE_ACTIONS", True)
 AVG_POT_SIZE = POKER_CONFIG.getint("AVG_POT_SIZE")
+CHANCE_WORKERS = RESOLVER_CONFIG.getint("CHANCE_WORKERS", 0)
 
 
 class NodeType(Enum):
@@ -46,6 +52,7 @@ class SubtreeNode:
         utility_matrix: np.ndarray,
         regrets: np.ndarray,
         values: np.ndarray,
+        template: Optional[BettingTemplate] = None,
     ) -> None:
         self.stage = stage
         self.state = state
@@ -57,6 +64,13 @@ class SubtreeNode:
         self.regrets = regrets
         self.values = values
         self.visited: NodeVisitStatus = NodeVisitStatus.UNVISITED
+        # Set when ranges are passed down the tree in a rollout
+        self.ranges: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self.template = template
+        # Inverse of the probability of a child being sampled in this rollout
+        self.sample_weight = 1.0
+        # Of the strategies from the iterations the node was visited in
+        self.average_strategy = RunningAverage()
 
     def __str__(self, level=0, action=None) -> str:
         res = "\t" * level + f"{action} -> " + f"{self.node_type}\n"
@@ -66,6 +80,15 @@ class SubtreeNode:
             res += child.__str__(level + 1, act)
         return res
 
+    def __getstate__(self):
+        # Templates are looked up again when needed, rather than pickling
+        # the whole betting tree below them, and ranges are only used
+        # within a rollout
+        state = self.__dict__.copy()
+        state["template"] = None
+        state["ranges"] = None
+        return state
+
 
 class SubtreeManager:
     """
@@ -82,6 +105,14 @@ class SubtreeManager:
         end_stage: PokerGameStage,
         end_depth: int,
         strategy: np.ndarray,
+        action_limit: int = NBR_ACTIONS_IN_ROLLOUT,
+        cfr: Optional[CFRParameters] = None,
+        persistent: bool = PERSISTENT_TREE,
+        sample_actions: bool = SAMPLE_ACTIONS,
+        rng: Optional[np.random.Generator] = None,
+        chance_workers: int = CHANCE_WORKERS,
+        stats: Optional[ResolveStats] = None,
+        seed: Optional[int] = None,
     ):
         """
         Generates the initial subtree for a given game state
@@ -97,8 +128,26 @@ class SubtreeManager:
         end_stage: The stage at which the tree should
         end_depth: The depth at which the tree should end
         strategy: The current strategy for the starting node
+        action_limit: The number of actions explored per player node in a rollout,
+            -1 explores all of them
+        cfr: How regrets are updated, defaults to the configured CFR variant
+        persistent: Keep the tree, with its regrets and strategies, across rollouts
+            instead of regenerating the children of player nodes every rollout
+        sample_actions: In a persistent tree, only traverse action_limit uniformly
+            sampled actions per player node each rollout. The values of the sampled
+            children are weighted by the inverse of their sampling probability
+        rng: The generator used for random deals, and for shuffling and sampling
+            actions. Defaults to the global generators
+        chance_workers: Traverse the dealt children of chance nodes that lead to
+            more betting in a pool of this many processes, 0 traverses them here
+        stats: Where the time and work of the tree is recorded, not recorded by default
+        seed: Seeds a new generator when no rng is given, so that the deals and
+            the actions visited are the same every time
         """
-        utility_matrix = PokerOracle.calculate_utility_matrix(state.public_info)
+        if rng is None and seed is not None:
+            rng = np.random.default_rng(seed)
+        self.stats = stats if stats is not None else ResolveStats(enabled=False)
+        utility_matrix = self.utility_matrix(state.public_info)
         self.root = SubtreeNode(
             state.stage,
             state,
@@ -112,12 +161,31 @@ class SubtreeManager:
         self.end_stage = end_stage
         self.end_depth = end_depth
         self.root_player_index = state.current_player_index
+        self.action_limit = action_limit
+        self.cfr = cfr if cfr is not None else CFRParameters()
+        self.persistent = persistent
+        self.sample_actions = sample_actions
+        self.initial_strategy = strategy
+        self.iteration = 0
+        self.rng = rng
+        self.chance_pool = (
+            ResidentPool.instance("chance", chance_workers)
+            if chance_workers > 0
+            else None
+        )
+        # Utility matrices moved to shared memory, by the id of the original
+        self.shared_matrices: Dict[int, Tuple[np.ndarray, SharedArray]] = {}
+        # Keys of the trees kept by the workers of the chance pool, one per worker,
+        # and the worker and key of every dealt child they keep, by its id
+        self.pool_keys: List[str] = []
+        self.resident: Dict[int, Tuple[int, str]] = {}
+        # In a worker, the dealt children kept by the tree, by their key
+        self.dealt_children: Dict[str, SubtreeNode] = {}
 
         self.generate_initial_sub_tree(self.root)
 
-        # initialize the neural net module
-
-        self.nn_manager = NNManager()
+        # The networks are shared by every subtree in the process
+        self.nn_manager = NNManager.instance()
 
     def generate_initial_sub_tree(self, node: SubtreeNode):
         """
@@ -125,76 +193,193 @@ class SubtreeManager:
         """
         self.generate_children(node)
 
-    def generate_children(self, node: SubtreeNode, action_limit: int = -1):
+    def generate_full_tree(self, node: SubtreeNode):
         """
-        Adds children to the given node based on its state
-        relies on the StateManager to generate the legal state/action pairs
+        Expands the whole tree below the given node, using every legal action
+        """
+        self.generate_children(node)
+        for _, child in node.children:
+            self.generate_full_tree(child)
 
-        For chance nodes there is no action, but child states based on random deals
+    def run_iteration(self, r1: np.ndarray, r2: np.ndarray) -> np.ndarray:
         """
+        Runs a single rollout and strategy update from the root
 
-        if node.node_type in [NodeType.SHOWDOWN, NodeType.TERMINAL, NodeType.WON]:
-            return
+        Returns the updated strategy at the root
+        """
+        self.iteration += 1
+        self.stats.count("iterations")
+        self.subtree_traversal_rollout(self.root, r1, r2)
+        with self.stats.phase("regrets"):
+            return self.update_strategy_at_node(self.root)
 
-        if node.node_type == NodeType.CHANCE and node.children != []:
-            for _, child in node.children:
-                child.visited = NodeVisitStatus.UNVISITED
-            return
+    def average_strategy(self) -> np.ndarray:
+        """
+        Returns the average strategy at the root over the iterations run so far
+        """
+        return self.root.average_strategy.value
 
-        child_states: List[Tuple[Action, GameState]] = StateManager.get_child_states(
-            node.state, NBR_EVENTS
-        )
+    def warm_start(
+        self, previous: SubtreeNode, iteration: int, deep: Optional[bool] = None
+    ):
+        """
+        Seeds the tree with the strategies, regrets and average strategies of
+        a node from an earlier tree for the same state, and of its descendants
+        along the actions both trees share. The iteration count continues
+        from that of the earlier tree, so the CFR weights stay consistent
 
-        random.shuffle(child_states)
+        Unless deep is set, only the root is seeded in a tree that is not
+        persistent, as its other player nodes are regenerated every rollout
+        """
+        self.iteration = iteration
+        self.seed_node(self.root, previous, self.persistent if deep is None else deep)
+
+    def seed_node(self, node: SubtreeNode, previous: SubtreeNode, deep: bool):
+        node.strategy = previous.strategy.copy()
+        node.regrets = previous.regrets.copy()
+        node.average_strategy = copy.deepcopy(previous.average_strategy)
 
-        nbr_actions = 0
-        for action, new_state in child_states:
-            # Limit child generation
-            if action is not None and action_limit != -1:
-                if nbr_actions >= action_limit:
+        if not deep or len(previous.children) == 0:
+            return
+
+        if len(node.children) == 0:
+            self.generate_children(node)
+        for action, child in node.children:
+            if child.node_type != NodeType.PLAYER:
+                continue
+            for previous_action, previous_child in previous.children:
+                if previous_action == action:
+                    self.seed_node(child, previous_child, deep)
                     break
-                nbr_actions += 1
 
-            depth = node.depth + 1 if node.stage == new_state.stage else 0
-            node_type = NodeType.PLAYER
-            utility_matrix = node.utility_matrix.copy()
+    @staticmethod
+    def find_node(node: SubtreeNode, state: GameState) -> Optional[SubtreeNode]:
+        """
+        Returns the player node of the tree below node with the same
+        betting situation and public cards as the state, if there is one
+        """
+        if (
+            node.node_type == NodeType.PLAYER
+            and node.stage == state.stage
+            and betting_key(node.state) == betting_key(state)
+            and [card.id for card in node.state.public_info]
+            == [card.id for card in state.public_info]
+        ):
+            return node
 
-            child_actions = [a for a, _ in node.children]
+        for _, child in node.children:
+            match = SubtreeManager.find_node(child, state)
+            if match is not None:
+                return match
+        return None
 
-            if action is not None and action in child_actions:
-                # Child state is already added
-                child = node.children[child_actions.index(action)][1]
-                child.visited = NodeVisitStatus.UNVISITED
-                continue
+    def generate_children(self, node: SubtreeNode, action_limit: int = -1):
+        """
+        Adds children to the given node based on its state
+        relies on the StateManager to generate the legal state/action pairs
 
-            if new_state.stage == PokerGameStage.SHOWDOWN:
-                node_type = NodeType.SHOWDOWN
-            elif new_state.game_state_type == PokerGameStateType.WINNER:
-                node_type = NodeType.WON
-            elif new_state.stage.value > self.end_stage.value or (
-                new_state.stage == self.end_stage and depth == self.end_depth
-            ):
-                node_type = NodeType.TERMINAL
-                utility_matrix = PokerOracle.calculate_utility_matrix(
-                    new_state.public_info
-                )
-            elif new_state.game_state_type == PokerGameStateType.DEALER:
-                node_type = NodeType.CHANCE
-                utility_matrix = PokerOracle.calculate_utility_matrix(
-                    new_state.public_info
+        For chance nodes there is no action, but child states based on random deals
+        """
+        with self.stats.phase("tree generation"):
+            if node.node_type in [NodeType.SHOWDOWN, NodeType.TERMINAL, NodeType.WON]:
+                return
+
+            if node.node_type == NodeType.CHANCE and node.children != []:
+                for _, child in node.children:
+                    child.visited = NodeVisitStatus.UNVISITED
+                return
+
+            child_states: List[Tuple[Action, GameState, Optional[BettingTemplate]]] = []
+            with self.stats.phase("state copies"):
+                if node.node_type == NodeType.CHANCE:
+                    child_states = [
+                        (action, new_state, None)
+                        for action, new_state in StateManager.get_child_states(
+                            node.state, NBR_EVENTS, self.rng
+                        )
+                    ]
+                else:
+                    # The betting structure only depends on public betting info,
+                    # so it is looked up rather than generated by the StateManager
+                    if node.template is None:
+                        node.template = BettingTemplate.for_state(node.state)
+                    child_states = [
+                        (action, template.instantiate(node.state), template)
+                        for action, template in node.template.children
+                    ]
+            self.stats.count("state copies", len(child_states))
+
+            if self.rng is not None:
+                child_states = [
+                    child_states[i] for i in self.rng.permutation(len(child_states))
+                ]
+            else:
+                random.shuffle(child_states)
+
+            nbr_actions = 0
+            for action, new_state, template in child_states:
+                # Limit child generation
+                if action is not None and action_limit != -1:
+                    if nbr_actions >= action_limit:
+                        break
+                    nbr_actions += 1
+
+                depth = node.depth + 1 if node.stage == new_state.stage else 0
+                node_type = NodeType.PLAYER
+                # The utility matrix is never written to, so children on the same
+                # board can share it with their parent
+                utility_matrix = node.utility_matrix
+
+                child_actions = [a for a, _ in node.children]
+
+                if action is not None and action in child_actions:
+                    # Child state is already added
+                    child = node.children[child_actions.index(action)][1]
+                    child.visited = NodeVisitStatus.UNVISITED
+                    continue
+
+                if new_state.stage == PokerGameStage.SHOWDOWN:
+                    node_type = NodeType.SHOWDOWN
+                elif new_state.game_state_type == PokerGameStateType.WINNER:
+                    node_type = NodeType.WON
+                elif new_state.stage.value > self.end_stage.value or (
+                    new_state.stage == self.end_stage and depth == self.end_depth
+                ):
+                    # Terminal nodes are valued by the networks,
+                    # so they have no use for a utility matrix
+                    node_type = NodeType.TERMINAL
+                elif new_state.game_state_type == PokerGameStateType.DEALER:
+                    node_type = NodeType.CHANCE
+                    utility_matrix = self.utility_matrix(new_state.public_info)
+
+                if self.persistent:
+                    # Nodes in a persistent tree keep their own regrets,
+                    # so they start out fresh
+                    strategy = self.initial_strategy
+                    regrets = np.zeros_like(node.regrets)
+                else:
+                    strategy = node.strategy
+                    regrets = node.regrets.copy()
+
+                new_node = SubtreeNode(
+                    new_state.stage,
+                    new_state,
+                    depth,
+                    node_type,
+                    strategy,
+                    utility_matrix,
+                    regrets,
+                    node.values.copy(),
+                    template,
                 )
+                node.children.append((action, new_node))
+                self.stats.count("nodes created")
 
-            new_node = SubtreeNode(
-                new_state.stage,
-                new_state,
-                depth,
-                node_type,
-                node.strategy,
-                utility_matrix,
-                node.regrets.copy(),
-                node.values.copy(),
-            )
-            node.children.append((action, new_node))
+    def utility_matrix(self, public_info: List[Card]) -> np.ndarray:
+        with self.stats.phase("utility matrices"):
+            utility_matrix = PokerOracle.calculate_utility_matrix(public_info)
+        self.stats.count("matrices built")
+        return utility_matrix
 
     def subtree_traversal_rollout(
         self,
@@ -204,10 +389,150 @@ class SubtreeManager:
     ) -> Tuple[np.ndarray, np.ndarray]:
         """
         Performs a rollout from a given node in the subtree
+
+        The ranges are first passed down the tree, collecting the terminal nodes.
+        These are evaluated with one batched forward pass per network,
+        before the values are passed back up the tree
+        """
+        terminal_nodes: List[SubtreeNode] = []
+        chance_tasks: List[Tuple[SubtreeNode, int, np.ndarray, np.ndarray]] = []
+        with self.stats.phase("range updates"):
+            self.propagate_ranges(node, r1, r2, terminal_nodes, chance_tasks)
+        if len(chance_tasks) > 0:
+            with self.stats.phase("chance pool"):
+                self.traverse_in_pool(chance_tasks)
+        with self.stats.phase("terminal values"):
+            self.evaluate_terminal_nodes(terminal_nodes)
+        with self.stats.phase("values"):
+            return self.propagate_values(node)
+
+    def propagate_ranges(
+        self,
+        node: SubtreeNode,
+        r1: np.ndarray,
+        r2: np.ndarray,
+        terminal_nodes: List[SubtreeNode],
+        chance_tasks: Optional[List] = None,
+    ):
+        """
+        Sets the ranges reaching every node visited in this rollout,
+        adding the terminal nodes that need a network evaluation to terminal_nodes
+
+        With a chance pool, the dealt children that are left to the pool are added
+        to chance_tasks as (chance node, child index, r1, r2) instead
+        """
+        node.visited = NodeVisitStatus.VISITED_THIS_ITERATION
+        node.ranges = (r1, r2)
+        match node.node_type:
+            case NodeType.TERMINAL:
+                terminal_nodes.append(node)
+
+            case NodeType.PLAYER:
+                ranges = [r1, r2]
+
+                player_index = (
+                    node.state.current_player_index + self.root_player_index
+                ) % 2
+
+                r_p = ranges[player_index]
+                r_o = ranges[1 - player_index]
+
+                if self.persistent:
+                    children = self.persistent_children(node)
+                else:
+                    # Rollouts generate the tree each time
+                    node.children = []
+                    self.generate_children(node, action_limit=self.action_limit)
+                    children = node.children
+
+                for action, child in children:
+                    if child.visited == NodeVisitStatus.VISITED_PREVIOUSLY:
+                        continue
+
+                    child.visited = NodeVisitStatus.VISITED_PREVIOUSLY
+                    a = agent_action_index(action)
+                    r_p_a = SubtreeManager.bayesian_range_update(r_p, node.strategy, a)
+                    self.stats.count("range updates")
+                    r_o_a = r_o
+
+                    action_ranges = [r_p_a, r_o_a]
+                    r1_a = action_ranges[player_index]
+                    r2_a = action_ranges[1 - player_index]
+
+                    self.propagate_ranges(
+                        child, r1_a, r2_a, terminal_nodes, chance_tasks
+                    )
+
+            case NodeType.CHANCE:
+                self.generate_children(node)
+                r1_e = SubtreeManager.update_range_from_public_cards(
+                    r1, node.state.public_info
+                )
+                r2_e = SubtreeManager.update_range_from_public_cards(
+                    r2, node.state.public_info
+                )
+                for i, (_, child) in enumerate(node.children):
+                    if self.in_pool(child) and chance_tasks is not None:
+                        chance_tasks.append((node, i, r1_e, r2_e))
+                        continue
+
+                    self.propagate_ranges(
+                        child, r1_e, r2_e, terminal_nodes, chance_tasks
+                    )
+
+    def evaluate_terminal_nodes(self, terminal_nodes: List[SubtreeNode]):
         """
+        Sets the values of the terminal nodes, running the network
+        of each stage once for all of its terminal nodes
+        """
+        stages: Dict[PokerGameStage, List[SubtreeNode]] = {}
+        for node in terminal_nodes:
+            stages.setdefault(node.state.stage, []).append(node)
+
+        for stage, nodes in stages.items():
+            v1, v2 = self.network_values(
+                stage,
+                nodes,
+                [node.ranges[0] for node in nodes],
+                [node.ranges[1] for node in nodes],
+            )
+            for i, node in enumerate(nodes):
+                node.values = np.array([v1[i], v2[i]])
+
+    def network_values(
+        self,
+        stage: PokerGameStage,
+        nodes: List[SubtreeNode],
+        r1: List[np.ndarray],
+        r2: List[np.ndarray],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Values of terminal nodes of a stage for the given ranges,
+        from one forward pass of the network
+        """
+        # Networks are loaded on first use
+        with self.stats.phase("network loading"):
+            network = self.nn_manager.get_network(stage)
+        encoder = InputEncoder.for_size(len(nodes[0].state.public_info))
+        in_vectors = encoder.encode(
+            r1,
+            r2,
+            [node.state.public_info for node in nodes],
+            [node.state.pot for node in nodes],
+        )
+        self.stats.count("network calls")
+        self.stats.count("network inputs", len(nodes))
+        with self.stats.phase("network"):
+            return network.predict_values_batch(in_vectors)
+
+    def propagate_values(self, node: SubtreeNode) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Computes the values of every node visited in this rollout,
+        from the leaves and up
+        """
+        r1, r2 = node.ranges
         # Initialize vectors to be overridden
         v1, v2 = np.zeros_like(r1), np.zeros_like(r2)
-        node.visited = NodeVisitStatus.VISITED_THIS_ITERATION
         match node.node_type:
             case NodeType.SHOWDOWN:
                 v1 = node.utility_matrix @ r2.T
@@ -228,59 +553,41 @@ class SubtreeManager:
                 v2 *= node.state.pot / AVG_POT_SIZE
 
             case NodeType.TERMINAL:
-                network = self.nn_manager.get_network(node.state.stage)
-                in_vector = create_input_vector(
-                    r1, r2, node.state.public_info, node.state.pot
-                )
-                v1, v2 = network.predict_values(in_vector)
-            case NodeType.PLAYER:
-                ranges = [r1, r2]
+                # Already evaluated in a batch
+                v1, v2 = node.values
 
+            case NodeType.PLAYER:
                 player_index = (
                     node.state.current_player_index + self.root_player_index
                 ) % 2
-
-                r_p = ranges[player_index]
-                r_o = ranges[1 - player_index]
-
-                # Rollouts generate the tree each time
-                nbr_actions = RESOLVER_CONFIG.getint("NBR_ACTIONS_IN_ROLLOUT")
-                node.children = []
-                self.generate_children(node, action_limit=nbr_actions)
+                values = [v1, v2]
                 for action, child in node.children:
-                    if child.visited == NodeVisitStatus.VISITED_PREVIOUSLY:
+                    if child.visited != NodeVisitStatus.VISITED_THIS_ITERATION:
                         continue
 
-                    child.visited = NodeVisitStatus.VISITED_PREVIOUSLY
                     a = agent_action_index(action)
-                    r_p_a = SubtreeManager.bayesian_range_update(r_p, node.strategy, a)
-                    r_o_a = r_o
-
-                    action_ranges = [r_p_a, r_o_a]
-                    r1_a = action_ranges[player_index]
-                    r2_a = action_ranges[1 - player_index]
-
-                    v1_a, v2_a = self.subtree_traversal_rollout(
-                        child,
-                        r1_a,
-                        r2_a,
+                    child_values = self.propagate_values(child)
+                    # The acting player's values are weighted by the strategy of
+                    # each hand, the other player's by the probability of the action,
+                    # which its range was divided by when passed down
+                    p_action = SubtreeManager.action_probability(node.strategy, a)
+                    values[player_index] += (
+                        node.sample_weight
+                        * node.strategy[:, a]
+                        * child_values[player_index]
+                    )
+                    values[1 - player_index] += (
+                        node.sample_weight * p_action * child_values[1 - player_index]
                     )
-                    v1 += node.strategy[:, a] * v1_a
-                    v2 += node.strategy[:, a] * v2_a
 
             case NodeType.CHANCE:
-                self.generate_children(node)
                 S = len(node.children)
                 for _, child in node.children:
-                    r1_e, r2_e = r1, r2
-                    r1_e = SubtreeManager.update_range_from_public_cards(
-                        r1_e, node.state.public_info
-                    )
-                    r2_e = SubtreeManager.update_range_from_public_cards(
-                        r2_e, node.state.public_info
-                    )
-
-                    v1_e, v2_e = self.subtree_traversal_rollout(child, r1_e, r2_e)
+                    if self.in_pool(child):
+                        # Already passed up the tree in the pool
+                        v1_e, v2_e = child.values
+                    else:
+                        v1_e, v2_e = self.propagate_values(child)
                     v1 += v1_e
                     v2 += v2_e
 
@@ -291,49 +598,261 @@ class SubtreeManager:
 
         return v1, v2
 
+    def in_pool(self, node: SubtreeNode) -> bool:
+        """
+        Whether a dealt child is traversed in the chance pool. Only children
+        leading to more betting are, as leaves are cheaper to value here
+        """
+        return self.chance_pool is not None and node.node_type == NodeType.PLAYER
+
+    def traverse_in_pool(
+        self, chance_tasks: List[Tuple[SubtreeNode, int, np.ndarray, np.ndarray]]
+    ):
+        """
+        Runs the rollout and the regret updates below dealt children in the
+        chance pool, setting the values of the children the workers send back
+
+        A child is sent to a worker the first time it is traversed, and stays
+        there until the workers are released, so every iteration only sends
+        the ranges and the values, in one call per worker. Its utility matrices
+        are moved to shared memory first, so the workers map them instead of
+        receiving copies
+        """
+        if len(self.pool_keys) == 0:
+            for worker in range(self.chance_pool.workers):
+                key = uuid.uuid4().hex
+                self.chance_pool.place(key, self.resident_tree(), worker)
+                self.pool_keys.append(key)
+
+        placed: List[Dict[str, SubtreeNode]] = [{} for _ in self.pool_keys]
+        tasks: List[List[Tuple[str, np.ndarray, np.ndarray]]] = [
+            [] for _ in self.pool_keys
+        ]
+        children: List[List[SubtreeNode]] = [[] for _ in self.pool_keys]
+        for node, i, r1, r2 in chance_tasks:
+            child = node.children[i][1]
+            if id(child) not in self.resident:
+                self.share_matrices(child)
+                worker = len(self.resident) % len(self.pool_keys)
+                self.resident[id(child)] = (worker, uuid.uuid4().hex)
+                placed[worker][self.resident[id(child)][1]] = child
+
+            worker, key = self.resident[id(child)]
+            tasks[worker].append((key, r1, r2))
+            children[worker].append(child)
+
+        workers = [worker for worker in range(len(tasks)) if len(tasks[worker]) > 0]
+        seeds = (
+            self.rng.integers(2**63, size=len(workers))
+            if self.rng is not None
+            else [None] * len(workers)
+        )
+        calls = [
+            (
+                self.pool_keys[worker],
+                "traverse_dealt_children",
+                (placed[worker], tasks[worker], self.iteration, seed),
+            )
+            for worker, seed in zip(workers, seeds)
+        ]
+        for worker, values in zip(workers, self.chance_pool.call(calls)):
+            for child, child_values in zip(children[worker], values):
+                child.values = child_values
+
+    def resident_tree(self) -> "SubtreeManager":
+        """
+        The tree kept by a worker of the chance pool, for its dealt children
+        """
+        tree = copy.copy(self)
+        tree.root = None
+        tree.nn_manager = None
+        tree.chance_pool = None
+        tree.shared_matrices = {}
+        tree.pool_keys = []
+        tree.resident = {}
+        tree.dealt_children = {}
+        return tree
+
+    def traverse_dealt_children(
+        self,
+        placed: Dict[str, SubtreeNode],
+        tasks: List[Tuple[str, np.ndarray, np.ndarray]],
+        iteration: int,
+        seed: Optional[int],
+    ) -> List[np.ndarray]:
+        """
+        Runs an iteration below the dealt children kept by a worker of the
+        chance pool, for the (key, r1, r2) of each child to traverse,
+        returning the values of the children
+
+        The children are kept from the first time they are placed, and the
+        terminal nodes below all of them are evaluated together
+        """
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self.nn_manager = NNManager.instance()
+        self.iteration = iteration
+        self.dealt_children.update(placed)
+
+        nodes = [self.dealt_children[key] for key, _, _ in tasks]
+        terminal_nodes: List[SubtreeNode] = []
+        for node, (_, r1, r2) in zip(nodes, tasks):
+            self.propagate_ranges(node, r1, r2, terminal_nodes)
+        self.evaluate_terminal_nodes(terminal_nodes)
+
+        values = []
+        for node in nodes:
+            self.propagate_values(node)
+            self.update_strategy_at_node(node)
+            values.append(node.values)
+        return values
+
+    def share_matrices(self, node: SubtreeNode):
+        """
+        Moves the utility matrices of the subtree to shared memory
+        """
+        if not isinstance(node.utility_matrix, SharedArray):
+            key = id(node.utility_matrix)
+            if key not in self.shared_matrices:
+                # The original is kept so its id is not reused
+                self.shared_matrices[key] = (
+                    node.utility_matrix,
+                    share(node.utility_matrix),
+                )
+            node.utility_matrix = self.shared_matrices[key][1]
+
+        for _, child in node.children:
+            self.share_matrices(child)
+
+    def release_workers(self):
+        """
+        Takes the dealt children kept in the chance pool back into the tree,
+        with their regrets and strategies, and frees the shared memory of
+        the utility matrices. Call it once the tree is done being iterated
+        """
+        if len(self.pool_keys) > 0:
+            dealt_children: Dict[str, SubtreeNode] = {}
+            for tree in self.chance_pool.take(self.pool_keys):
+                dealt_children.update(tree.dealt_children)
+            self.replace_resident(self.root, dealt_children)
+            self.pool_keys = []
+            self.resident = {}
+
+        for _, shared in self.shared_matrices.values():
+            release(shared)
+        self.shared_matrices = {}
+
+    def replace_resident(
+        self, node: SubtreeNode, dealt_children: Dict[str, SubtreeNode]
+    ):
+        for i, (action, child) in enumerate(node.children):
+            if id(child) in self.resident:
+                _, key = self.resident[id(child)]
+                node.children[i] = (action, dealt_children[key])
+            else:
+                self.replace_resident(child, dealt_children)
+
+    def persistent_children(
+        self, node: SubtreeNode
+    ) -> List[Tuple[Action, SubtreeNode]]:
+        """
+        Returns the children of a player node to visit in this rollout
+
+        The children are only generated the first time the node is visited,
+        and are then reused for every later rollout
+        """
+        if len(node.children) == 0:
+            self.generate_children(node)
+
+        for _, child in node.children:
+            child.visited = NodeVisitStatus.UNVISITED
+
+        if self.sample_actions and 0 <= self.action_limit < len(node.children):
+            node.sample_weight = len(node.children) / self.action_limit
+            if self.rng is not None:
+                sampled = self.rng.choice(
+                    len(node.children), self.action_limit, replace=False
+                )
+                return [node.children[i] for i in sampled]
+            return random.sample(node.children, self.action_limit)
+
+        node.sample_weight = 1.0
+        return node.children
+
     def update_strategy_at_node(self, node: SubtreeNode):
         for _, child in node.children:
-            if child.visited == NodeVisitStatus.VISITED_PREVIOUSLY:
+            if child.visited != NodeVisitStatus.VISITED_THIS_ITERATION:
                 continue
             self.update_strategy_at_node(child)
         if node.node_type == NodeType.PLAYER:
-            R_t = node.regrets
             player_index = (
                 node.state.current_player_index + self.root_player_index
             ) % 2
-            for h in HOLE_PAIR_INDICES:
-                node_value = node.values[player_index][h]
-                for action, child in node.children:
-                    if child.visited != NodeVisitStatus.VISITED_THIS_ITERATION:
-                        continue
-                    a = agent_action_index(action)
-                    child_value = child.values[player_index][h]
-                    R_t[h, a] += child_value - node_value
-            node.regrets = R_t
-            R_plus = np.clip(R_t, 0, None)
-            R_plus_sum = np.sum(R_plus, axis=1)
+            if self.cfr.updates_player(player_index, self.iteration):
+                self.update_regrets_at_node(node, player_index)
+
+            node.average_strategy.add(
+                node.strategy, self.cfr.strategy_weight(self.iteration)
+            )
+            return node.strategy
+
+    def update_regrets_at_node(self, node: SubtreeNode, player_index: int):
+        """
+        Accumulates the regrets of a player node, and does regret matching
+        """
+        instant_regrets = np.zeros_like(node.regrets)
+        visited = [
+            (agent_action_index(action), child)
+            for action, child in node.children
+            if child.visited == NodeVisitStatus.VISITED_THIS_ITERATION
+        ]
+        if len(visited) > 0:
+            # All hands and visited actions at once: (hands, actions)
+            actions = [a for a, _ in visited]
+            child_values = np.stack(
+                [child.values[player_index] for _, child in visited], axis=1
+            )
+            instant_regrets[:, actions] = (
+                child_values - node.values[player_index][:, None]
+            )
+        node.regrets = self.cfr.update_regrets(
+            node.regrets, instant_regrets, self.iteration
+        )
+        node.strategy = SubtreeManager.regret_matching(node.regrets, node.strategy)
 
-            divisor = R_plus_sum[:, None]
+    @staticmethod
+    def regret_matching(regrets: np.ndarray, strategy: np.ndarray) -> np.ndarray:
+        """
+        Computes the new strategy from the cumulative regrets
 
-            # Adding this to avoid the division by 0
-            divisor[np.where(divisor == 0)] = 1 / R_t.shape[1]
+        Falls back to the given strategy if the regrets give an empty strategy
+        """
+        R_plus = np.clip(regrets, 0, None)
+        R_plus_sum = np.sum(R_plus, axis=1)
 
-            strategy = R_plus / divisor
+        divisor = R_plus_sum[:, None]
 
-            if np.sum(strategy) == 0:
-                # Must avoid these bad strategies
-                # Using the original strategy instead
-                strategy = node.strategy
+        # Adding this to avoid the division by 0
+        divisor[np.where(divisor == 0)] = 1 / regrets.shape[1]
 
-            node.strategy = strategy
+        new_strategy = R_plus / divisor
 
-            return node.strategy
+        if np.sum(new_strategy) == 0:
+            # Must avoid these bad strategies
+            # Using the original strategy instead
+            new_strategy = strategy
+
+        return new_strategy
+
+    @staticmethod
+    def action_probability(strategy: np.ndarray, action_index: int) -> float:
+        return np.sum(strategy[:, action_index]) / np.sum(strategy) + 0.001
 
     @staticmethod
     def bayesian_range_update(
         range: np.ndarray, strategy: np.ndarray, action_index: int
     ):
-        p_action = np.sum(strategy[:, action_index]) / np.sum(strategy) + 0.001
+        p_action = SubtreeManager.action_probability(strategy, action_index)
 
         if np.sum(strategy) == 0:
             print("bad divide")
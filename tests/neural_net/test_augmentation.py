@@ -0,0 +1,48 @@
+import numpy as np
+
+from shallowstack.neural_net.augmentation import (
+    CARD_PERMUTATIONS,
+    HAND_SOURCES,
+    SuitAugmentation,
+)
+from shallowstack.poker.card import Card, Deck
+from shallowstack.poker.poker_oracle import PokerOracle
+
+
+def test_permutations_are_bijections():
+    assert len(HAND_SOURCES) == 24
+    for sources in HAND_SOURCES:
+        assert np.array_equal(np.sort(sources), np.arange(1326))
+
+
+def test_showdown_values_are_suit_invariant():
+    board = Deck().draw(5)
+    r = np.random.random(1326)
+    values = PokerOracle.calculate_utility_matrix(board) @ r
+
+    p = 7
+    permuted_board = [Card.from_id(CARD_PERMUTATIONS[p][card.id]) for card in board]
+    permuted_values = (
+        PokerOracle.calculate_utility_matrix(permuted_board) @ r[HAND_SOURCES[p]]
+    )
+
+    assert np.allclose(permuted_values, values[HAND_SOURCES[p]])
+
+
+def test_augmentation_permutes_every_part_of_the_example():
+    augmentation = SuitAugmentation(1326, 5)
+    board = [card.id for card in Deck().draw(5)]
+    example = np.random.random((1, 1326 * 4 + 5 + 2)).astype(np.float32)
+    example[0, 2652:2657] = board
+    original = example.copy()
+
+    augmented = augmentation(example, np.random.default_rng(0))[0]
+
+    # The same hole pair permutation is applied to the ranges and the targets
+    r1 = original[0, :1326]
+    v1 = original[0, 2658:3984]
+    assert np.array_equal(np.sort(augmented[:1326]), np.sort(r1))
+    sources = [np.argmax(r1 == x) for x in augmented[:1326]]
+    assert np.array_equal(augmented[2658:3984], v1[sources])
+    assert sorted(augmented[2652:2657] // 4) == sorted(np.array(board) // 4)
+    assert augmented[2657] == original[0, 2657]
@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from shallowstack.neural_net.batching_network import BatchingNetwork
+from shallowstack.neural_net.numpy_network import NumpyValueNetwork
+from shallowstack.neural_net.util import InputEncoder
+
+
+class CountingNetwork:
+    def __init__(self, network):
+        self.network = network
+        self.range_size = network.range_size
+        self.public_info_size = network.public_info_size
+        self.input_size = network.input_size
+        self.batch_sizes = []
+
+    def predict_values_batch(self, x):
+        self.batch_sizes.append(len(x))
+        return self.network.predict_values_batch(x)
+
+
+def test_concurrent_evaluations_share_batches():
+    network = NumpyValueNetwork.random(1326, 5)
+    counting = CountingNetwork(network)
+    batching = BatchingNetwork(counting, window=0.5, max_batch_size=8)
+
+    rng = np.random.default_rng(0)
+    inputs = [rng.random((2, network.input_size)) for _ in range(4)]
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(batching.predict_values_batch, inputs))
+
+    # The four calls fill one batch, which is run without waiting out the window
+    assert counting.batch_sizes == [8]
+    for x, (v1, v2) in zip(inputs, results):
+        e1, e2 = network.predict_values_batch(x)
+        assert np.allclose(v1, e1, atol=1e-5)
+        assert np.allclose(v2, e2, atol=1e-5)
+
+
+class EchoNetwork:
+    """
+    Returns the ranges of the input as the values
+    """
+
+    range_size = 1326
+    public_info_size = 5
+    input_size = 1326 * 2 + 5 + 1
+
+    def predict_values_batch(self, x):
+        return x[:, : self.range_size], x[:, self.range_size : 2 * self.range_size]
+
+
+def test_threads_get_the_values_of_their_own_inputs():
+    batching = BatchingNetwork(EchoNetwork(), window=0.01, max_batch_size=64)
+
+    def evaluate(thread: int) -> int:
+        wrong = 0
+        for i in range(50):
+            r = np.full((2, 1326), thread * 1000 + i, dtype=np.float32)
+            # Encoded into the buffer shared by the calls of the thread
+            x = InputEncoder.for_size(5).encode_public(r, r, np.zeros((2, 6)))
+            v1, v2 = batching.predict_values_batch(x)
+            wrong += int(not (np.all(v1 == r) and np.all(v2 == r)))
+        return wrong
+
+    with ThreadPoolExecutor(4) as executor:
+        assert sum(executor.map(evaluate, range(4))) == 0
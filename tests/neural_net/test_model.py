@@ -0,0 +1,42 @@
+import numpy as np
+import torch
+
+from shallowstack.neural_net.model import ValueNetwork
+
+
+def random_input(network: ValueNetwork, batch_size: int) -> np.ndarray:
+    return np.random.random((batch_size, network.input_size)).astype(np.float32)
+
+
+def test_predict_values_batch_matches_forward():
+    network = ValueNetwork(1326, 5).eval()
+    x = random_input(network, 8)
+
+    v1, v2 = network.predict_values_batch(x)
+    out = network(torch.from_numpy(x)).detach().numpy()
+
+    assert v1.shape == (8, 1326)
+    assert np.allclose(v1, out[:, :1326], atol=1e-6)
+    assert np.allclose(v2, out[:, 1326:2652], atol=1e-6)
+
+
+def test_predict_values_matches_batch():
+    network = ValueNetwork(1326, 3).eval()
+    x = random_input(network, 1)
+
+    v1, v2 = network.predict_values(torch.from_numpy(x))
+    b1, b2 = network.predict_values_batch(x)
+
+    assert np.array_equal(v1, b1[0])
+    assert np.array_equal(v2, b2[0])
+
+
+def test_quantized_network_is_close():
+    network = ValueNetwork(1326, 5).eval()
+    quantized = network.quantized()
+    x = random_input(network, 4)
+
+    v1, _ = network.predict_values_batch(x)
+    q1, _ = quantized.predict_values_batch(x)
+
+    assert np.allclose(v1, q1, atol=0.05)
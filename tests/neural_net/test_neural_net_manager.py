@@ -0,0 +1,40 @@
+import os
+
+import lightning as pl
+import torch
+
+from shallowstack.neural_net.model import ValueNetwork
+from shallowstack.neural_net.neural_net_manager import NNManager
+from shallowstack.state_manager.state_manager import PokerGameStage
+
+
+def test_instance_is_shared():
+    assert NNManager.instance() is NNManager.instance()
+
+
+def test_networks_are_loaded_once_in_eval_mode():
+    manager = NNManager()
+    network = manager.get_network(PokerGameStage.RIVER)
+
+    assert manager.get_network(PokerGameStage.RIVER) is network
+    assert not network.training
+
+
+def test_checkpoint_weights_are_loaded(tmp_path, monkeypatch):
+    trained = ValueNetwork(1326, 5)
+    checkpoint_dir = tmp_path / "lightning_logs/RIVER/lightning_logs/version_0"
+    os.makedirs(checkpoint_dir / "checkpoints")
+    torch.save(
+        {
+            "state_dict": trained.state_dict(),
+            "hyper_parameters": dict(trained.hparams),
+            "pytorch-lightning_version": pl.__version__,
+        },
+        checkpoint_dir / "checkpoints/epoch=0.ckpt",
+    )
+    monkeypatch.chdir(tmp_path)
+
+    network = NNManager().get_network(PokerGameStage.RIVER)
+
+    for name, weights in trained.state_dict().items():
+        assert torch.equal(network.state_dict()[name], weights)
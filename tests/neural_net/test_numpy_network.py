@@ -0,0 +1,55 @@
+import os
+
+import lightning as pl
+import numpy as np
+import pytest
+import torch
+
+from shallowstack.neural_net.model import ValueNetwork
+from shallowstack.neural_net.neural_net_manager import NNManager
+from shallowstack.neural_net.numpy_network import NumpyValueNetwork
+from shallowstack.state_manager.state_manager import PokerGameStage
+
+
+def save_checkpoint(network: ValueNetwork, stage: PokerGameStage):
+    checkpoint_dir = f"lightning_logs/{stage.name}/lightning_logs/version_0"
+    os.makedirs(f"{checkpoint_dir}/checkpoints")
+    torch.save(
+        {
+            "state_dict": network.state_dict(),
+            "hyper_parameters": dict(network.hparams),
+            "pytorch-lightning_version": pl.__version__,
+        },
+        f"{checkpoint_dir}/checkpoints/epoch=0.ckpt",
+    )
+
+
+def test_exported_network_matches_torch(tmp_path):
+    network = ValueNetwork(1326, 4).eval()
+    NumpyValueNetwork.export(network, tmp_path / "TURN.npz")
+    exported = NumpyValueNetwork.load(tmp_path / "TURN.npz")
+    x = np.random.random((8, network.input_size)).astype(np.float32)
+
+    v1, v2 = network.predict_values_batch(x)
+    n1, n2 = exported.predict_values_batch(x)
+
+    assert n1.shape == (8, 1326)
+    assert np.allclose(v1, n1, atol=1e-5)
+    assert np.allclose(v2, n2, atol=1e-5)
+
+
+def test_only_trained_networks_are_exported(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    save_checkpoint(ValueNetwork(1326, 3), PokerGameStage.FLOP)
+
+    NNManager(backend="torch", quantize=False).export_networks("models")
+
+    assert os.listdir("models") == ["FLOP.npz"]
+    network = NNManager(backend="numpy").get_network(PokerGameStage.FLOP)
+    assert isinstance(network, NumpyValueNetwork)
+    assert network.public_info_size == 3
+
+
+def test_export_requires_torch_backend(tmp_path):
+    with pytest.raises(RuntimeError):
+        NNManager(backend="numpy").export_networks(str(tmp_path))
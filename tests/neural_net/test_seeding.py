@@ -0,0 +1,43 @@
+import copy
+
+import numpy as np
+
+from shallowstack.neural_net.datamodule import get_random_example
+from shallowstack.neural_net.shards import ShardWriter, count_duplicate_rows
+from shallowstack.poker.card import Deck
+from shallowstack.state_manager.state_manager import PokerGameStage
+
+
+def test_decks_draw_from_their_generator():
+    d1 = Deck(rng=np.random.default_rng(1))
+    d2 = Deck(rng=np.random.default_rng(1))
+
+    assert d1.draw(5) == d2.draw(5)
+
+
+def test_deep_copied_decks_share_the_stream():
+    deck = Deck(rng=np.random.default_rng(1))
+    copied = copy.deepcopy(deck)
+
+    assert copied.rng is deck.rng
+    assert deck.draw(5) != copied.draw(5)
+
+
+def test_examples_depend_only_on_their_seed():
+    s1, s2 = np.random.SeedSequence(7).spawn(2)
+
+    first = get_random_example((PokerGameStage.FLOP, 3, s1)).copy()
+    again = get_random_example((PokerGameStage.FLOP, 3, s1)).copy()
+    other = get_random_example((PokerGameStage.FLOP, 3, s2)).copy()
+
+    assert np.array_equal(first, again)
+    assert not np.array_equal(first, other)
+
+
+def test_duplicate_rows_are_counted(tmp_path):
+    writer = ShardWriter(str(tmp_path), 2, 3)
+    for i in [0, 1, 2, 1, 3, 0]:
+        writer.add(np.full(2, i))
+    writer.flush()
+
+    assert count_duplicate_rows(str(tmp_path)) == 2
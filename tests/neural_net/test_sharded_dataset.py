@@ -0,0 +1,44 @@
+import numpy as np
+from torch.utils.data import DataLoader
+
+from shallowstack.neural_net.sharded_dataset import ShardedDataset
+from shallowstack.neural_net.shards import ShardWriter
+
+
+def numbered_dataset(path: str, size: int, shard_size: int) -> str:
+    writer = ShardWriter(path, 2, shard_size)
+    for i in range(size):
+        writer.add(np.full(2, i))
+    writer.flush()
+    return path
+
+
+def row_ids(batches) -> np.ndarray:
+    return np.concatenate([batch[:, 0].numpy() for batch in batches]).astype(int)
+
+
+def test_split_serves_index_range_in_order(tmp_path):
+    data_dir = numbered_dataset(str(tmp_path), 50, 10)
+
+    dataset = ShardedDataset(data_dir, 5, 27, batch_size=4)
+
+    assert np.array_equal(row_ids(dataset), np.arange(5, 27))
+
+
+def test_shuffled_split_serves_every_row_once(tmp_path):
+    data_dir = numbered_dataset(str(tmp_path), 50, 10)
+
+    dataset = ShardedDataset(data_dir, 0, 45, batch_size=8, shuffle=True)
+    ids = row_ids(dataset)
+
+    assert not np.array_equal(ids, np.arange(45))
+    assert np.array_equal(np.sort(ids), np.arange(45))
+
+
+def test_loader_workers_split_the_shards(tmp_path):
+    data_dir = numbered_dataset(str(tmp_path), 50, 10)
+    dataset = ShardedDataset(data_dir, 0, 50, batch_size=8, shuffle=True)
+
+    loader = DataLoader(dataset, batch_size=None, num_workers=2)
+
+    assert np.array_equal(np.sort(row_ids(loader)), np.arange(50))
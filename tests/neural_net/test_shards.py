@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+
+from shallowstack.neural_net import datamodule
+from shallowstack.neural_net.datamodule import PokerDataModule
+from shallowstack.neural_net.shards import ShardWriter, load_manifest, shard_paths
+from shallowstack.state_manager.state_manager import PokerGameStage
+
+
+def test_shards_are_written_when_full(tmp_path):
+    writer = ShardWriter(str(tmp_path), 3, 10)
+    for i in range(25):
+        writer.add(np.full(3, i))
+
+    assert writer.size == 20
+    writer.flush()
+
+    manifest = load_manifest(str(tmp_path))
+    assert manifest["size"] == 25
+    assert [shard["rows"] for shard in manifest["shards"]] == [10, 10, 5]
+    rows = np.concatenate([np.load(path) for path in shard_paths(str(tmp_path))])
+    assert rows.dtype == np.float32
+    assert np.array_equal(rows[:, 0], np.arange(25))
+
+
+def test_writer_resumes_from_manifest(tmp_path):
+    writer = ShardWriter(str(tmp_path), 3, 10)
+    for i in range(15):
+        writer.add(np.full(3, i))
+
+    # The half full shard is lost, as if the generation was interrupted
+    resumed = ShardWriter(str(tmp_path), 3, 10)
+
+    assert resumed.size == 10
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def fake_example(arg):
+    return np.ones(1326 * 4 + 5 + 2, dtype=np.float32)
+
+
+def test_generation_only_fills_missing_examples(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(datamodule, "get_random_example", fake_example)
+    monkeypatch.setattr(datamodule, "SHARD_SIZE", 4)
+    data = PokerDataModule(PokerGameStage.RIVER, 1)
+
+    data.generate_dataset(PokerGameStage.RIVER, 6)
+    data.generate_dataset(PokerGameStage.RIVER, 10)
+
+    manifest = load_manifest("data/RIVER")
+    assert [shard["rows"] for shard in manifest["shards"]] == [4, 2, 4]
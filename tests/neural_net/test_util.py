@@ -0,0 +1,51 @@
+import numpy as np
+
+from shallowstack.neural_net.util import InputEncoder
+from shallowstack.poker.card import Deck
+
+
+def random_situations(batch_size: int, nbr_public_cards: int):
+    r1 = np.random.random((batch_size, 1326))
+    r2 = np.random.random((batch_size, 1326))
+    public_cards = [Deck().draw(nbr_public_cards) for _ in range(batch_size)]
+    pots = list(np.random.randint(0, 400, batch_size))
+    return r1, r2, public_cards, pots
+
+
+def test_encode_matches_concatenation():
+    r1, r2, public_cards, pots = random_situations(4, 3)
+    encoder = InputEncoder(1326, 3)
+
+    x = encoder.encode(r1, r2, public_cards, pots)
+
+    public_info = np.array(
+        [[card.id for card in cards] + [pot] for cards, pot in zip(public_cards, pots)]
+    )
+    expected = np.concatenate([r1, r2, public_info], axis=1).astype(np.float32)
+    assert x.dtype == np.float32
+    assert np.array_equal(x, expected)
+
+
+def test_buffer_is_reused():
+    encoder = InputEncoder(1326, 5)
+
+    first = encoder.encode(*random_situations(8, 5))
+    second = encoder.encode(*random_situations(2, 5))
+
+    assert second.shape == (2, encoder.input_size)
+    assert np.shares_memory(first, second)
+
+
+def test_examples_hold_inputs_and_targets():
+    r1, r2, public_cards, pots = random_situations(2, 4)
+    v1 = np.random.random((2, 1326))
+    v2 = np.random.random((2, 1326))
+    encoder = InputEncoder(1326, 4)
+
+    examples = encoder.encode_examples(r1, r2, public_cards, pots, v1, v2)
+    x, y = np.split(examples, [encoder.input_size], axis=1)
+
+    assert np.array_equal(x, InputEncoder(1326, 4).encode(r1, r2, public_cards, pots))
+    assert np.allclose(y[:, :1326], v1)
+    assert np.allclose(y[:, 1326:2652], v2)
+    assert np.all(y[:, -1] == 0)
@@ -0,0 +1,115 @@
+import numpy as np
+
+from shallowstack.neural_net.bucketed_network import BucketedNetwork
+from shallowstack.neural_net.numpy_network import NumpyValueNetwork
+from shallowstack.poker.card import Deck
+from shallowstack.poker.card_abstraction import (
+    HOLE_CARD_IDS,
+    CardAbstraction,
+    equity_histograms,
+    kmeans,
+    river_equities,
+    valid_hands,
+)
+from shallowstack.poker.poker_oracle import PokerOracle
+from shallowstack.state_manager.state_manager import PokerGameStage
+
+
+def river_abstraction(nbr_buckets: int = 8) -> CardAbstraction:
+    return CardAbstraction.fit(
+        PokerGameStage.RIVER, nbr_buckets, 2, rng=np.random.default_rng(0)
+    )
+
+
+def test_kmeans_finds_separated_clusters():
+    rng = np.random.default_rng(0)
+    points = np.concatenate([rng.normal(0, 0.1, (50, 2)), rng.normal(5, 0.1, (50, 2))])
+
+    centroids = kmeans(points, 2, rng=rng)
+
+    assert np.allclose(sorted(centroids[:, 0]), [0, 5], atol=0.1)
+
+
+def test_river_histograms_are_one_hot():
+    board = Deck().draw(5)
+    valid = valid_hands([card.id for card in board])
+
+    histograms = equity_histograms(board)
+
+    assert np.all(histograms[valid].max(axis=1) == 1)
+    assert np.all(histograms[~valid] == 0)
+
+
+def test_bucketed_ranges_keep_mass_and_values_expand():
+    abstraction = river_abstraction()
+    board = Deck().draw(5)
+    table = abstraction.bucket_table([card.id for card in board])
+    tables = table[None]
+    r = np.random.random((1, 1326))
+    r[0, table == abstraction.nbr_buckets] = 0
+
+    buckets = abstraction.bucket_ranges(r, tables)
+    values = abstraction.expand_values(
+        abstraction.bucket_values(np.ones((1, 1326)), r, tables), tables
+    )
+
+    assert buckets.shape == (1, abstraction.nbr_buckets)
+    assert np.isclose(buckets.sum(), r.sum())
+    assert np.allclose(values[0, table < abstraction.nbr_buckets], 1)
+    assert np.all(values[0, table == abstraction.nbr_buckets] == 0)
+
+
+def test_bucketed_network_takes_hand_vectors():
+    abstraction = river_abstraction()
+    network = BucketedNetwork(
+        NumpyValueNetwork.random(abstraction.nbr_buckets, 5), abstraction
+    )
+    board = Deck().draw(5)
+    x = np.zeros((3, network.input_size), dtype=np.float32)
+    x[:, :2652] = np.random.random((3, 2652))
+    x[:, 2652:2657] = [card.id for card in board]
+    x[:, -1] = 100
+
+    v1, v2 = network.predict_values_batch(x)
+
+    blocked = ~valid_hands([card.id for card in board])
+    assert v1.shape == (3, 1326)
+    assert np.all(v1[:, blocked] == 0)
+    assert len(np.unique(v2[0])) <= abstraction.nbr_buckets + 1
+
+
+def test_river_equities_match_the_utility_matrix():
+    board = Deck(rng=np.random.default_rng(1)).draw(5)
+    valid = valid_hands([card.id for card in board])
+
+    # Counted over every pair of hands that do not share a card
+    hole_cards = np.zeros((1326, 52))
+    hole_cards[np.arange(1326), HOLE_CARD_IDS[:, 0]] = 1
+    hole_cards[np.arange(1326), HOLE_CARD_IDS[:, 1]] = 1
+    opponents = valid[None, :] & ((hole_cards @ hole_cards.T) == 0)
+    utility_matrix = PokerOracle.calculate_utility_matrix(board)
+    score = (utility_matrix > 0) + 0.5 * (utility_matrix == 0)
+    expected = (opponents * score).sum(axis=1) / opponents.sum(axis=1)
+
+    assert np.allclose(river_equities(board)[valid], expected[valid])
+
+
+def test_histograms_are_the_same_for_a_board():
+    board = Deck(rng=np.random.default_rng(2)).draw(4)
+
+    first = equity_histograms(board)
+    # The order of the public cards does not matter
+    second = equity_histograms(board[::-1])
+
+    assert np.array_equal(first, second)
+
+
+def test_seeded_fit_is_reproducible():
+    fits = [
+        CardAbstraction.fit(
+            PokerGameStage.TURN, 4, 2, nbr_bins=5, rng=np.random.default_rng(3)
+        )
+        for _ in range(2)
+    ]
+
+    assert np.array_equal(fits[0].centroids, fits[1].centroids)
@@ -0,0 +1,13 @@
+import numpy as np
+import pytest
+
+from benchmarks.states import river_state
+
+
+@pytest.fixture
+def river_resolve():
+    """
+    Arguments of a small river resolve on a fixed board, with uniform ranges
+    """
+    r = np.ones(1326) / 1326
+    return river_state(seed=0), r, r.copy()
@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import pytest
+
+from shallowstack.game.action import AGENT_ACTIONS
+from shallowstack.resolver.async_resolver import AsyncResolver
+from shallowstack.state_manager.state_manager import PokerGameStage
+
+
+@pytest.fixture
+def async_resolver():
+    resolver = AsyncResolver(workers=1)
+    yield resolver
+    resolver.close()
+
+
+def test_resolves_without_blocking(async_resolver, river_resolve):
+    state, r1, r2 = river_resolve
+
+    async def main():
+        future = async_resolver.resolve(state, r1, r2, PokerGameStage.RIVER, 1, 2)
+        # The loop is free while the worker resolves
+        await asyncio.sleep(0)
+        assert not future.done()
+        return await future
+
+    result = asyncio.run(main())
+    assert result.iterations == 2
+    assert result.strategy.shape == (1326, len(AGENT_ACTIONS))
+
+
+def test_deadline_is_the_time_budget(async_resolver, river_resolve):
+    state, r1, r2 = river_resolve
+
+    async def main():
+        return await async_resolver.resolve(
+            state, r1, r2, PokerGameStage.RIVER, 1, 10**6, deadline=0.5
+        )
+
+    result = asyncio.run(main())
+    assert 1 <= result.iterations < 10**6
+
+
+def test_cancel_stops_the_worker(async_resolver, river_resolve):
+    state, r1, r2 = river_resolve
+
+    async def main():
+        future = async_resolver.resolve(state, r1, r2, PokerGameStage.RIVER, 1, 10**6)
+        await asyncio.sleep(1)
+        future.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await future
+
+        # The only worker is free again once the cancelled resolve has stopped
+        return await asyncio.wait_for(
+            async_resolver.resolve(state, r1, r2, PokerGameStage.RIVER, 1, 1), 60
+        )
+
+    result = asyncio.run(main())
+    assert result.iterations == 1
+
+
+def test_time_waiting_for_a_worker_counts_against_the_deadline(
+    async_resolver, river_resolve
+):
+    state, r1, r2 = river_resolve
+
+    async def main():
+        # Keeps the only worker busy for a second
+        busy = async_resolver.resolve(
+            state, r1, r2, PokerGameStage.RIVER, 1, 10**6, deadline=1.0
+        )
+        start = time.perf_counter()
+        result = await async_resolver.resolve(
+            state, r1, r2, PokerGameStage.RIVER, 1, 10**6, deadline=1.5
+        )
+        await busy
+        return result, time.perf_counter() - start
+
+    result, elapsed = asyncio.run(main())
+    assert result.iterations >= 1
+    # Only the half second left is used, not the whole deadline
+    assert elapsed < 2.5
@@ -0,0 +1,98 @@
+import numpy as np
+
+from benchmarks.states import turn_state
+from shallowstack.game.action import AGENT_ACTIONS, agent_action_index
+from shallowstack.resolver.resolver import Resolver
+from shallowstack.state_manager.state_manager import PokerGameStage
+
+
+def test_fixed_number_of_iterations(river_resolve):
+    state, r1, r2 = river_resolve
+    result = Resolver().resolve(state, r1, r2, PokerGameStage.RIVER, 1, 3)
+
+    assert result.iterations == 3
+    assert result.strategy.shape == (1326, len(AGENT_ACTIONS))
+
+
+def test_time_budget_limits_iterations(river_resolve):
+    state, r1, r2 = river_resolve
+    result = Resolver().resolve(
+        state, r1, r2, PokerGameStage.RIVER, 1, 1000, time_budget=0.0
+    )
+
+    # At least one iteration is run, even when the budget is already spent
+    assert result.iterations == 1
+    assert result.strategy.shape == (1326, len(AGENT_ACTIONS))
+
+
+def test_stops_below_exploitability_threshold(river_resolve):
+    state, r1, r2 = river_resolve
+    result = Resolver().resolve(
+        state,
+        r1,
+        r2,
+        PokerGameStage.RIVER,
+        1,
+        20,
+        exploitability_interval=2,
+        exploitability_threshold=np.inf,
+    )
+
+    assert result.iterations == 2
+    assert [t for t, _ in result.convergence] == [2]
+
+
+def test_warm_starts_from_previous_tree(river_resolve):
+    state, r1, r2 = river_resolve
+    resolver = Resolver()
+    first = resolver.resolve(state, r1, r2, PokerGameStage.RIVER, 1, 2)
+    assert not first.warm_started
+
+    second = resolver.resolve(state, r1, r2, PokerGameStage.RIVER, 1, 2)
+    assert second.warm_started
+
+    resolver.reset()
+    third = resolver.resolve(state, r1, r2, PokerGameStage.RIVER, 1, 2)
+    assert not third.warm_started
+
+
+def test_ensemble_averages_solves(river_resolve):
+    state, r1, r2 = river_resolve
+    resolver = Resolver()
+    result = resolver.resolve(
+        state, r1, r2, PokerGameStage.RIVER, 1, 2, ensemble_size=2
+    )
+
+    assert result.iterations == 4
+    assert result.strategy.shape == (1326, len(AGENT_ACTIONS))
+    # The solve run in this process is kept for the next resolve
+    assert resolver.previous_tree is not None
+
+
+def test_profiled_resolve_records_phases(river_resolve):
+    state, r1, r2 = river_resolve
+    result = Resolver().resolve(state, r1, r2, PokerGameStage.RIVER, 1, 3, profile=True)
+
+    assert result.stats.counts["iterations"] == 3
+    assert result.stats.counts["nodes created"] > 0
+    assert result.stats.times["regrets"] > 0
+
+    unprofiled = Resolver().resolve(state, r1, r2, PokerGameStage.RIVER, 1, 3)
+    assert len(unprofiled.stats.counts) == 0
+
+
+def test_seeded_resolves_are_identical():
+    state = turn_state(seed=0)
+    r = np.ones(1326) / 1326
+
+    # Ending on the river deals cards at the chance nodes
+    results = [
+        Resolver().resolve(state, r, r.copy(), PokerGameStage.RIVER, 1, 3, seed=7)
+        for _ in range(2)
+    ]
+
+    assert np.array_equal(results[0].strategy, results[1].strategy)
+    assert np.array_equal(results[0].r1, results[1].r1)
+    assert agent_action_index(results[0].action) == agent_action_index(
+        results[1].action
+    )
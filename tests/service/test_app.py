@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+
+from benchmarks.states import river_state
+from shallowstack.service.app import create_app
+
+
+def test_resolve_returns_action_and_ranges():
+    state = river_state(seed=0)
+    r = [1 / 1326] * 1326
+    request = {
+        "state": {
+            "stage": state.stage.name,
+            "current_player_index": state.current_player_index,
+            "player_bets": state.player_bets.tolist(),
+            "player_chips": state.player_chips.tolist(),
+            "player_checks": state.player_checks.tolist(),
+            "players_in_game": state.players_in_game.tolist(),
+            "players_all_in": state.players_all_in.tolist(),
+            "pot": state.pot,
+            "bet_to_match": state.bet_to_match,
+            "public_cards": [card.id for card in state.public_info],
+        },
+        "r1": r,
+        "r2": r,
+        "end_stage": "RIVER",
+        "end_depth": 1,
+        "nbr_rollouts": 2,
+    }
+
+    with TestClient(create_app()) as client:
+        response = client.post("/resolve", json=request)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["iterations"] == 2
+    assert len(body["r1"]) == 1326
+    assert np.isclose(sum(body["r2"]), 1)
+
+
+def test_invalid_stage_is_rejected():
+    with TestClient(create_app()) as client:
+        response = client.post(
+            "/resolve",
+            json={
+                "state": {
+                    "stage": "SHOWDOWN_",
+                    "current_player_index": 0,
+                    "player_bets": [0, 0],
+                    "player_chips": [1000, 1000],
+                    "player_checks": [0, 0],
+                    "players_in_game": [1, 1],
+                    "players_all_in": [False, False],
+                    "pot": 0,
+                    "bet_to_match": 0,
+                    "public_cards": [],
+                },
+                "r1": [],
+                "r2": [],
+                "end_stage": "RIVER",
+                "end_depth": 1,
+                "nbr_rollouts": 1,
+            },
+        )
+
+    assert response.status_code == 422
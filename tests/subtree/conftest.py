@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from benchmarks.states import river_state as build_river_state
+from shallowstack.game.action import AGENT_ACTIONS
+from shallowstack.state_manager.state_manager import PokerGameStage
+from shallowstack.subtree.cfr import CFRParameters
+from shallowstack.subtree.subtree_manager import SubtreeManager
+
+
+@pytest.fixture
+def river_state():
+    """
+    Builds river states, with random public cards unless seeded
+    """
+    return build_river_state
+
+
+@pytest.fixture
+def river_tree():
+    """
+    Builds fully expanded, persistent river trees on a fixed board
+    """
+
+    def build(
+        end_depth: int, cfr: CFRParameters = None, persistent: bool = True
+    ) -> SubtreeManager:
+        state = build_river_state(seed=0)
+        strategy = np.ones((1326, len(AGENT_ACTIONS))) / len(AGENT_ACTIONS)
+        return SubtreeManager(
+            state,
+            PokerGameStage.RIVER,
+            end_depth,
+            strategy,
+            action_limit=-1,
+            cfr=cfr,
+            persistent=persistent,
+        )
+
+    return build
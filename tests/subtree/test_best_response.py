@@ -0,0 +1,33 @@
+import numpy as np
+
+from shallowstack.subtree.best_response import BestResponse
+from shallowstack.subtree.lookahead import Lookahead
+
+
+def test_exploitability_decreases(river_tree):
+    tree = river_tree(3)
+    r = np.ones(1326) / 1326
+
+    tree.run_iteration(r, r)
+    first = BestResponse.exploitability(tree, r, r)
+    for _ in range(19):
+        tree.run_iteration(r, r)
+
+    assert BestResponse.exploitability(tree, r, r) < first
+
+
+def test_lookahead_exploitability_matches_object_tree(river_tree):
+    tree = river_tree(1)
+    lookahead = Lookahead(river_tree(1))
+    r = np.ones(1326) / 1326
+
+    for _ in range(5):
+        tree.run_iteration(r, r)
+        lookahead.run_iteration(r, r)
+    lookahead.store_strategies()
+
+    assert np.isclose(
+        BestResponse.exploitability(lookahead.tree, r, r),
+        BestResponse.exploitability(tree, r, r),
+        atol=1e-5,
+    )
@@ -0,0 +1,48 @@
+import numpy as np
+
+from shallowstack.state_manager.state_manager import StateManager
+from shallowstack.subtree.betting_template import BettingTemplate
+
+
+def test_template_is_cached(river_state):
+    state = river_state()
+    other = river_state()
+
+    assert BettingTemplate.for_state(state) is BettingTemplate.for_state(other)
+
+
+def test_template_matches_state_manager(river_state):
+    state = river_state()
+    template = BettingTemplate.for_state(state)
+
+    expected = StateManager.get_actions_with_new_states(state)
+
+    assert [a for a, _ in template.children] == [a for a, _ in expected]
+    for (_, child), (_, expected_state) in zip(template.children, expected):
+        new_state = child.instantiate(state)
+        assert new_state.public_info == state.public_info
+        assert new_state.pot == expected_state.pot
+        assert new_state.game_state_type == expected_state.game_state_type
+        assert np.all(new_state.player_bets == expected_state.player_bets)
+        assert new_state.current_player_index == expected_state.current_player_index
+
+
+def test_instantiated_states_do_not_share_arrays(river_state):
+    state = river_state()
+    template = BettingTemplate.for_state(state)
+
+    new_state = template.instantiate(state)
+    new_state.player_chips[0] -= 100
+
+    assert template.state.player_chips[0] == state.player_chips[0]
+
+
+def test_cache_is_bounded(river_state, monkeypatch):
+    monkeypatch.setattr("shallowstack.subtree.betting_template.TEMPLATE_CACHE_SIZE", 5)
+    BettingTemplate.clear_cache()
+
+    state = river_state()
+    BettingTemplate.for_state(state)
+
+    assert len(BettingTemplate._cache) == 5
+    BettingTemplate.clear_cache()
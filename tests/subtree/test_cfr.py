@@ -0,0 +1,63 @@
+import numpy as np
+
+from shallowstack.subtree.cfr import CFRParameters, CFRVariant, RunningAverage
+
+
+def test_vanilla_accumulates_regrets():
+    cfr = CFRParameters(CFRVariant.VANILLA)
+    regrets = np.array([[1.0, -2.0]])
+    instant = np.array([[0.5, 0.5]])
+
+    assert np.array_equal(cfr.update_regrets(regrets, instant, 3), [[1.5, -1.5]])
+    assert cfr.strategy_weight(3) == 1.0
+
+
+def test_cfr_plus_floors_regrets():
+    cfr = CFRParameters(CFRVariant.CFR_PLUS)
+    regrets = np.array([[1.0, -2.0]])
+    instant = np.array([[0.5, 0.5]])
+
+    assert np.array_equal(cfr.update_regrets(regrets, instant, 3), [[1.5, 0.0]])
+    assert cfr.strategy_weight(3) == 3.0
+
+
+def test_linear_cfr_discounts_previous_iterations():
+    cfr = CFRParameters(CFRVariant.LINEAR)
+    regrets = np.array([[1.0, -2.0]])
+    instant = np.zeros((1, 2))
+
+    # Regrets from iteration 1 are worth half of those from iteration 2
+    assert np.array_equal(cfr.update_regrets(regrets, instant, 2), [[0.5, -1.0]])
+    assert np.array_equal(cfr.update_regrets(regrets, instant, 1), regrets)
+    assert cfr.strategy_weight(4) == 4.0
+
+
+def test_discounted_cfr_parameters():
+    cfr = CFRParameters(CFRVariant.DISCOUNTED, alpha=2.0, beta=0.0, gamma=3.0)
+    regrets = np.array([[1.0, -2.0]])
+    instant = np.zeros((1, 2))
+
+    updated = cfr.update_regrets(regrets, instant, 3)
+    assert np.allclose(updated, [[4 / 5, -1.0]])
+    assert cfr.strategy_weight(2) == 8.0
+
+
+def test_alternating_updates():
+    cfr = CFRParameters(alternating=True)
+
+    assert cfr.updates_player(0, 1)
+    assert not cfr.updates_player(1, 1)
+    assert cfr.updates_player(1, 2)
+    assert CFRParameters(alternating=False).updates_player(1, 1)
+
+
+def test_running_average_matches_weighted_average():
+    cfr = CFRParameters(CFRVariant.DISCOUNTED)
+    strategies = np.random.random((10, 4, 3))
+    weights = [cfr.strategy_weight(t + 1) for t in range(10)]
+
+    average = RunningAverage()
+    for strategy, weight in zip(strategies, weights):
+        average.add(strategy, weight)
+
+    assert np.allclose(average.value, np.average(strategies, axis=0, weights=weights))
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from shallowstack.subtree.cfr import CFRParameters, CFRVariant
+from shallowstack.subtree.lookahead import Lookahead
+
+
+def test_lookahead_levels_cover_tree(river_tree):
+    tree = river_tree(3)
+    lookahead = Lookahead(tree)
+
+    def count(node):
+        return 1 + sum(count(child) for _, child in node.children)
+
+    assert sum(level.size for level in lookahead.levels) == count(tree.root)
+
+
+@pytest.mark.parametrize(
+    "cfr",
+    [
+        CFRParameters(CFRVariant.VANILLA),
+        CFRParameters(CFRVariant.CFR_PLUS),
+        CFRParameters(CFRVariant.DISCOUNTED, alternating=True),
+    ],
+)
+def test_lookahead_matches_object_tree(river_tree, cfr: CFRParameters):
+    tree = river_tree(1, cfr)
+    lookahead = Lookahead(tree)
+
+    r1 = np.random.random(1326)
+    r1 /= r1.sum()
+    r2 = np.random.random(1326)
+    r2 /= r2.sum()
+
+    strategies = []
+    for _ in range(5):
+        expected = tree.run_iteration(r1, r2)
+        strategy = lookahead.run_iteration(r1, r2)
+        strategies.append(expected)
+
+        # The network runs in float32, batched on one side and one by one on the other
+        assert np.allclose(strategy, expected, atol=1e-5)
+
+    weights = [cfr.strategy_weight(t + 1) for t in range(5)]
+    average = np.average(strategies, axis=0, weights=weights)
+    assert np.allclose(tree.average_strategy(), average)
+    assert np.allclose(lookahead.average_strategy(), average, atol=1e-5)
+
+
+def test_lookahead_matches_persistent_object_tree(river_tree):
+    tree = river_tree(3)
+    lookahead = Lookahead(tree)
+
+    r1 = np.ones(1326) / 1326
+    r2 = np.ones(1326) / 1326
+
+    for _ in range(3):
+        expected = tree.run_iteration(r1, r2)
+        strategy = lookahead.run_iteration(r1, r2)
+
+        assert np.allclose(strategy, expected, atol=1e-5)
@@ -0,0 +1,74 @@
+import copy
+import os
+import pickle
+
+import numpy as np
+
+from benchmarks.states import turn_state
+from shallowstack.game.action import AGENT_ACTIONS
+from shallowstack.neural_net.neural_net_manager import NNManager
+from shallowstack.state_manager.state_manager import PokerGameStage
+from shallowstack.subtree.parallel import ResidentPool, release, share
+from shallowstack.subtree.subtree_manager import NodeType, SubtreeManager, SubtreeNode
+
+
+def test_shared_arrays_are_pickled_by_reference():
+    array = np.random.random((100, 100))
+    shared = share(array)
+
+    data = pickle.dumps(shared)
+    assert len(data) < 1000
+    assert np.array_equal(pickle.loads(data), array)
+    # Slices are copied
+    assert np.array_equal(pickle.loads(pickle.dumps(shared[:2])), array[:2])
+
+    release(shared)
+    assert not os.path.exists(shared.shared_path)
+    assert np.array_equal(shared, array)
+
+
+def strategies(node: SubtreeNode) -> list:
+    """
+    The strategies of every player node, in the order of the tree
+    """
+    res = [node.strategy] if node.node_type == NodeType.PLAYER else []
+    for _, child in node.children:
+        res += strategies(child)
+    return res
+
+
+def test_chance_pool_matches_serial_traversal():
+    # Forked workers share the networks loaded before the pool is created
+    NNManager.instance().get_network(PokerGameStage.RIVER)
+    strategy = np.ones((1326, len(AGENT_ACTIONS))) / len(AGENT_ACTIONS)
+    # Betting continues after the river is dealt
+    serial = SubtreeManager(
+        turn_state(seed=0),
+        PokerGameStage.RIVER,
+        1,
+        strategy,
+        action_limit=-1,
+        persistent=True,
+        rng=np.random.default_rng(0),
+    )
+    # Dealt up front, so both trees have the same boards
+    serial.generate_full_tree(serial.root)
+    pooled = copy.deepcopy(serial)
+    pooled.chance_pool = ResidentPool.instance("chance", 2)
+
+    r = np.ones(1326) / 1326
+    for _ in range(2):
+        serial.run_iteration(r, r)
+        pooled.run_iteration(r, r)
+
+    assert len(pooled.resident) > 0
+    assert len(pooled.shared_matrices) > 0
+    # The subtrees come back from the workers with their regrets and strategies
+    pooled.release_workers()
+    assert len(pooled.resident) == 0
+    assert np.allclose(pooled.root.values, serial.root.values, atol=1e-5)
+    assert np.allclose(pooled.average_strategy(), serial.average_strategy(), atol=1e-5)
+    for pooled_strategy, serial_strategy in zip(
+        strategies(pooled.root), strategies(serial.root), strict=True
+    ):
+        assert np.allclose(pooled_strategy, serial_strategy, atol=1e-5)
@@ -0,0 +1,67 @@
+import numpy as np
+
+from shallowstack.game.action import agent_action_index
+from shallowstack.subtree.subtree_manager import SubtreeManager
+
+
+def test_persistent_tree_keeps_children(river_tree):
+    tree = river_tree(3)
+    r = np.ones(1326) / 1326
+
+    tree.run_iteration(r, r)
+    children = [child for _, child in tree.root.children]
+    grandchildren = [
+        [grandchild for _, grandchild in child.children] for child in children
+    ]
+
+    tree.run_iteration(r, r)
+
+    assert [child for _, child in tree.root.children] == children
+    for child, expected in zip(children, grandchildren):
+        assert [grandchild for _, grandchild in child.children] == expected
+
+
+def test_sampled_actions_only_visit_limit(river_tree):
+    tree = river_tree(3)
+    tree.action_limit = 2
+    r = np.ones(1326) / 1326
+
+    tree.run_iteration(r, r)
+
+    visited = [
+        child
+        for _, child in tree.root.children
+        if child.visited.name == "VISITED_THIS_ITERATION"
+    ]
+    assert len(visited) == 2
+    assert len(tree.root.children) > 2
+
+
+def test_sampled_values_are_importance_weighted(river_tree):
+    tree = river_tree(3)
+    tree.action_limit = 2
+    r = np.ones(1326) / 1326
+    root = tree.root
+    # The values are computed with the strategy from before the update
+    strategy = root.strategy
+
+    tree.run_iteration(r, r)
+
+    assert root.sample_weight == len(root.children) / 2
+    visited = [
+        (agent_action_index(action), child)
+        for action, child in root.children
+        if child.visited.name == "VISITED_THIS_ITERATION"
+    ]
+    # The root player acts, so only its values are weighted per hand
+    expected_v1 = sum(
+        root.sample_weight * strategy[:, a] * child.values[0] for a, child in visited
+    )
+    expected_v2 = sum(
+        root.sample_weight
+        * SubtreeManager.action_probability(strategy, a)
+        * child.values[1]
+        for a, child in visited
+    )
+    assert np.allclose(root.values[0], expected_v1)
+    assert np.allclose(root.values[1], expected_v2)
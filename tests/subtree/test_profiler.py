@@ -0,0 +1,36 @@
+import time
+
+from shallowstack.subtree.profiler import ResolveStats
+
+
+def test_nested_phases_are_not_counted_twice():
+    stats = ResolveStats(enabled=True)
+    with stats.phase("outer"):
+        time.sleep(0.02)
+        with stats.phase("inner"):
+            time.sleep(0.05)
+    stats.count("nodes", 3)
+
+    assert 0.02 <= stats.times["outer"] < 0.05
+    assert stats.times["inner"] >= 0.05
+    assert stats.counts["nodes"] == 3
+
+
+def test_disabled_stats_record_nothing():
+    stats = ResolveStats(enabled=False)
+    with stats.phase("outer"):
+        stats.count("nodes")
+
+    assert len(stats.times) == 0
+    assert len(stats.counts) == 0
+
+
+def test_merge_adds_up():
+    a, b = ResolveStats(enabled=True), ResolveStats(enabled=True)
+    a.count("iterations", 2)
+    b.count("iterations", 3)
+    b.times["network"] = 1.5
+    a.merge(b)
+
+    assert a.counts["iterations"] == 5
+    assert a.times["network"] == 1.5
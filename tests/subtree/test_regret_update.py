@@ -0,0 +1,17 @@
+import numpy as np
+
+from benchmarks.regret_update import fixed_river_tree, loop_regret_update
+
+
+def test_vectorized_regret_update_matches_loop():
+    tree = fixed_river_tree()
+    root = tree.root
+
+    start = root.regrets.copy()
+    loop_regret_update(tree, root)
+    expected = root.regrets.copy()
+
+    root.regrets = start
+    tree.update_strategy_at_node(root)
+
+    assert np.array_equal(root.regrets, expected)
@@ -0,0 +1,52 @@
+import numpy as np
+
+from benchmarks.states import turn_state
+from shallowstack.game.action import AGENT_ACTIONS
+from shallowstack.state_manager.state_manager import (
+    PokerGameStage,
+    PokerGameStateType,
+    StateManager,
+)
+from shallowstack.subtree.subtree_manager import SubtreeManager, SubtreeNode
+
+
+def walk(node: SubtreeNode, action=None) -> list:
+    """
+    The actions and public cards of every node, in the order they were generated
+    """
+    res = [
+        (
+            action.action_type if action is not None else None,
+            [card.id for card in node.state.public_info],
+        )
+    ]
+    for child_action, child in node.children:
+        res += walk(child, child_action)
+    return res
+
+
+def test_seeded_deals_are_the_same():
+    state = turn_state(seed=0)
+    state.game_state_type = PokerGameStateType.DEALER
+
+    first = StateManager.get_child_states(state, 5, seed=3)
+    second = StateManager.get_child_states(state, 5, seed=3)
+    assert [[card.id for card in s.public_info] for _, s in first] == [
+        [card.id for card in s.public_info] for _, s in second
+    ]
+
+
+def test_seeded_trees_are_the_same():
+    state = turn_state(seed=0)
+    strategy = np.ones((1326, len(AGENT_ACTIONS))) / len(AGENT_ACTIONS)
+    r = np.ones(1326) / 1326
+
+    trees = [
+        SubtreeManager(state, PokerGameStage.RIVER, 1, strategy, seed=5)
+        for _ in range(2)
+    ]
+    for tree in trees:
+        tree.run_iteration(r, r.copy())
+
+    assert walk(trees[0].root) == walk(trees[1].root)
+    assert np.array_equal(trees[0].root.strategy, trees[1].root.strategy)
@@ -0,0 +1,31 @@
+import numpy as np
+
+from shallowstack.neural_net.util import create_input_vector
+from shallowstack.subtree.subtree_manager import NodeType, NodeVisitStatus
+
+
+def visited_terminal_nodes(node):
+    if node.visited != NodeVisitStatus.VISITED_THIS_ITERATION:
+        return
+    if node.node_type == NodeType.TERMINAL:
+        yield node
+    for _, child in node.children:
+        yield from visited_terminal_nodes(child)
+
+
+def test_batched_terminal_values_match_single_evaluation(river_tree):
+    tree = river_tree(2)
+    r = np.ones(1326) / 1326
+    tree.run_iteration(r, r)
+
+    terminal_nodes = list(visited_terminal_nodes(tree.root))
+    assert len(terminal_nodes) > 1
+
+    for node in terminal_nodes:
+        network = tree.nn_manager.get_network(node.state.stage)
+        r1, r2 = node.ranges
+        v1, v2 = network.predict_values(
+            create_input_vector(r1, r2, node.state.public_info, node.state.pot)
+        )
+        assert np.allclose(node.values[0], v1, atol=1e-6)
+        assert np.allclose(node.values[1], v2, atol=1e-6)
@@ -0,0 +1,54 @@
+import numpy as np
+
+from shallowstack.game.action import AGENT_ACTIONS, agent_action_index
+from shallowstack.state_manager.state_manager import PokerGameStage
+from shallowstack.subtree.subtree_manager import NodeType, SubtreeManager
+
+
+def next_decision(tree: SubtreeManager):
+    """
+    A node where the root player acts again, after an action by each player
+    """
+    for _, child in tree.root.children:
+        for _, grandchild in child.children:
+            if grandchild.node_type == NodeType.PLAYER:
+                return grandchild
+
+
+def test_find_node(river_tree):
+    tree = river_tree(3)
+    tree.run_iteration(np.ones(1326) / 1326, np.ones(1326) / 1326)
+    node = next_decision(tree)
+
+    assert SubtreeManager.find_node(tree.root, node.state) is node
+    assert SubtreeManager.find_node(node, tree.root.state) is None
+
+
+def test_warm_start_seeds_matching_nodes(river_tree):
+    tree = river_tree(3)
+    r = np.ones(1326) / 1326
+    for _ in range(3):
+        tree.run_iteration(r, r)
+    previous = next_decision(tree)
+
+    strategy = np.ones((1326, len(AGENT_ACTIONS))) / len(AGENT_ACTIONS)
+    new_tree = SubtreeManager(
+        previous.state,
+        PokerGameStage.RIVER,
+        3,
+        strategy,
+        action_limit=-1,
+        persistent=True,
+    )
+    new_tree.warm_start(previous, tree.iteration)
+
+    assert new_tree.iteration == tree.iteration
+    assert np.array_equal(new_tree.root.regrets, previous.regrets)
+    assert np.array_equal(
+        new_tree.root.average_strategy.value, previous.average_strategy.value
+    )
+    previous_children = {agent_action_index(a): c for a, c in previous.children}
+    for action, child in new_tree.root.children:
+        if child.node_type == NodeType.PLAYER:
+            previous_child = previous_children[agent_action_index(action)]
+            assert np.array_equal(child.regrets, previous_child.regrets)